@@ -0,0 +1,176 @@
+"""Load test for JokeCompetition and TimerCog against the offline stand-ins.
+
+Drives competition starts, thousands of submissions and votes, lookups,
+concurrent closes and script timers through the real cog code. Reports p50/p99
+latency and REST calls per operation. Run from the repo root:
+
+    python -m benchmarks.bench_load --submissions 5000 --votes 20000 --rest-latency-ms 20
+    python -m benchmarks.bench_load --rate-limit 5/5   # Discord-like per-channel buckets
+"""
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import time
+from collections import defaultdict
+
+import discord
+
+from benchmarks.fake_discord import (
+    FakeAttachment, FakeBot, FakeDiscord, FakeGuild, FakeInteraction, FakeMessage, FakeUser, current_operation, fake_text
+)
+from cogs.joke_competition import JokeCompetition
+from cogs.timer import TimerCog
+from utils.ratelimit import SubmissionLimiter, parse_rate_limits
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    async def measure(self, operation: str, coro):
+        """Await ``coro`` with REST calls attributed to ``operation``, recording its latency"""
+        token = current_operation.set(operation)
+        start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self.samples[operation].append(time.perf_counter() - start)
+            current_operation.reset(token)
+
+    def report(self, hub: FakeDiscord) -> str:
+        lines = [f"{'operation':<18}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'REST/op':>10}  REST calls"]
+        for operation, samples in self.samples.items():
+            ordered = sorted(samples)
+            p50 = statistics.median(ordered) * 1000
+            p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000
+            calls = hub.rest_by_operation.get(operation, {})
+            per_op = sum(calls.values()) / len(samples)
+            detail = ", ".join(f"{route}={count}" for route, count in sorted(calls.items()))
+            lines.append(f"{operation:<18}{len(samples):>8}{p50:>10.1f}{p99:>10.1f}{per_op:>10.2f}  {detail}")
+        return "\n".join(lines)
+
+
+async def gather_bounded(limit: int, coros):
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(coro) for coro in coros))
+
+
+async def run(args):
+    rate_limit = None
+    if args.rate_limit:
+        requests, per = args.rate_limit.split('/')
+        rate_limit = (int(requests), float(per))
+    hub = FakeDiscord(args.rest_latency_ms / 1000, args.download_latency_ms / 1000, rate_limit)
+    bot = FakeBot(hub)
+    if args.submission_limits:
+        bot.submission_limiter = SubmissionLimiter(parse_rate_limits(args.submission_limits))
+    guild = FakeGuild(hub)
+    guild.me = bot.user
+    jokes = guild.add_text_channel('jokes')
+    guild.add_text_channel('script-discussions')
+    moderator = FakeUser(hub, hub.next_id(), 'moderator', permissions=discord.Permissions(manage_messages=True))
+    users = [FakeUser(hub, hub.next_id(), f"user{i}") for i in range(args.users)]
+    rng = random.Random(args.seed)
+    recorder = LatencyRecorder()
+
+    jokes_cog = JokeCompetition(bot)
+    timer_cog = TimerCog(bot)
+    await bot.add_cog(jokes_cog)
+    await bot.add_cog(timer_cog)
+
+    wall_start = time.perf_counter()
+
+    # Competition starts through the slash command callback; its latency is the time to acknowledge,
+    # the setup itself runs as a background job
+    for i in range(args.competitions):
+        interaction = FakeInteraction(hub, moderator, jokes)
+        await recorder.measure('startjoke', jokes_cog.startjoke.callback(
+            jokes_cog, interaction, "now", "2h", f"Competition {i}: {fake_text(-i)}?"
+        ))
+    await bot.drain_events()
+    threads = [hub.channels[thread_id] for thread_id in jokes_cog.active_competitions]
+
+    # Submissions, a share of them with an image
+    messages = []
+    for i in range(args.submissions):
+        attachments = []
+        if args.image_every and i % args.image_every == 0:
+            attachments = [FakeAttachment(hub, f"{i}.png", bytes(args.image_bytes))]
+        messages.append(FakeMessage(hub, rng.choice(threads), rng.choice(users), f"Punchline {i}: {fake_text(i)}", attachments))
+    await gather_bounded(args.concurrency, (recorder.measure('submission', jokes_cog.on_message(m)) for m in messages))
+    await bot.drain_events()
+
+    # Votes arrive as raw gateway reaction events
+    reposts = [m for thread in threads for m in thread.sent if m.content.startswith("**Punchline")]
+
+    async def vote():
+        message = rng.choice(reposts)
+        user = rng.choice(users)
+        hub.react(message, user)
+        await bot.drain_events()
+
+    for _ in range(args.votes):
+        await recorder.measure('vote', vote())
+
+    # Moderator lookups
+    for _ in range(args.lookups):
+        thread = rng.choice(threads)
+        number = rng.randint(1, max(1, len(jokes_cog.submissions[thread.id])))
+        interaction = FakeInteraction(hub, moderator, thread)
+        await recorder.measure('lookup', jokes_cog.lookup.callback(jokes_cog, interaction, number))
+
+    # Every competition closes at the same moment
+    await asyncio.gather(*(
+        recorder.measure('close', jokes_cog.close_competition(thread.id)) for thread in threads
+    ))
+
+    # Script timers: start, check and cancel in separate channels
+    for i in range(args.timers):
+        channel = guild.add_text_channel(f"writers-room-{i}")
+        await recorder.measure('timer', timer_cog.timer.callback(timer_cog, FakeInteraction(hub, moderator, channel), 30, f"Writer {i}"))
+        await recorder.measure('check_timer', timer_cog.check_timer.callback(timer_cog, FakeInteraction(hub, moderator, channel)))
+        await recorder.measure('cancel_timer', timer_cog.cancel_timer.callback(timer_cog, FakeInteraction(hub, moderator, channel)))
+
+    wall = time.perf_counter() - wall_start
+    await bot.close()
+
+    print(
+        f"{args.competitions} competitions, {args.submissions} submissions, {args.votes} votes, "
+        f"{args.timers} timers; REST latency {args.rest_latency_ms}ms, downloads {args.download_latency_ms}ms, "
+        f"rate limit {args.rate_limit or 'off'}"
+    )
+    print(recorder.report(hub))
+    print(f"total REST calls: {sum(hub.rest_calls.values())}, simulated rate-limit wait: {hub.rate_limit_wait:.1f}s, wall: {wall:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--competitions', type=int, default=10)
+    parser.add_argument('--submissions', type=int, default=2000)
+    parser.add_argument('--votes', type=int, default=5000)
+    parser.add_argument('--lookups', type=int, default=200)
+    parser.add_argument('--timers', type=int, default=50)
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=200, help='submissions in flight at once')
+    parser.add_argument('--image-every', type=int, default=10, help='every Nth submission carries an image (0 = none)')
+    parser.add_argument('--image-bytes', type=int, default=256 * 1024)
+    parser.add_argument('--rest-latency-ms', type=float, default=0)
+    parser.add_argument('--download-latency-ms', type=float, default=0)
+    parser.add_argument('--rate-limit', default='', help='per-bucket limit as REQUESTS/SECONDS, e.g. 5/5')
+    parser.add_argument('--submission-limits', default='', help='cog submission limits, e.g. user=5/30,thread=60/60')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help='keep the cogs\' info logging')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Time a busy competition's logging costs the calling thread, with synchronous vs queued logging.
+
+Each round logs what one large competition produces: a submission record per
+entry, a per-entry tally warning (the worst case, when every tally is missing)
+and the close summary. Records go to a real file, and every flush waits
+``--sink-latency-us`` like a slow disk or a container's log pipe. The
+synchronous setup formats and writes them on the caller, like
+``logging.basicConfig``. The queued pipeline only filters and enqueues them
+there. Run from the repo root:
+
+    python -m benchmarks.bench_logging --entries 500 --rounds 20 --sink-latency-us 200
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from utils.logs import DEFAULT_RATE_LIMITS, LogPipeline
+
+logger = logging.getLogger('discord')
+
+
+class SlowStream:
+    """File wrapper whose flush blocks like a slow log sink"""
+
+    def __init__(self, stream, latency: float):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, text):
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+        if self.latency:
+            time.sleep(self.latency)
+
+
+def log_competition(thread_id: int, entries: int):
+    for number in range(1, entries + 1):
+        logger.info(
+            "Received submission for thread %s as message %s", thread_id, thread_id + number,
+            extra={'category': 'submission', 'thread_id': thread_id, 'user_id': number}
+        )
+    for number in range(1, entries + 1):
+        logger.warning(
+            "Message %s has no vote count", thread_id + number,
+            extra={'category': 'tally', 'thread_id': thread_id}
+        )
+    logger.info("Posted %d winners in %d messages", 3, 1, extra={'thread_id': thread_id})
+
+
+def measure(name: str, args, install, uninstall):
+    with tempfile.NamedTemporaryFile('w', suffix='.log', delete=False) as out:
+        path = out.name
+    with open(path, 'w') as stream:
+        install(SlowStream(stream, args.sink_latency_us / 1e6))
+        start = time.perf_counter()
+        for round_number in range(args.rounds):
+            log_competition(round_number + 1, args.entries)
+        caller = time.perf_counter() - start
+        uninstall()
+        total = time.perf_counter() - start
+    lines = sum(1 for _ in open(path))
+    os.unlink(path)
+    records = args.rounds * (2 * args.entries + 1)
+    print(
+        f"{name:<24}{records:>9}{lines:>9}{caller * 1000:>12.1f}"
+        f"{caller / records * 1e6:>12.2f}{total * 1000:>12.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=500, help='submissions per competition')
+    parser.add_argument('--rounds', type=int, default=20, help='competitions logged')
+    parser.add_argument('--sink-latency-us', type=float, default=200, help='time each flush of the log sink blocks')
+    args = parser.parse_args()
+    root = logging.getLogger()
+
+    def install_sync(stream):
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter('%(levelname)s:%(name)s:%(message)s'))
+        root.handlers[:] = [handler]
+        root.setLevel(logging.INFO)
+
+    def uninstall_sync():
+        root.handlers[:] = []
+
+    pipelines = {}
+
+    def queued(name, rate_limits):
+        def install(stream):
+            pipelines[name] = LogPipeline(fmt='json', rate_limits=rate_limits, stream=stream)
+            pipelines[name].install()
+
+        def uninstall():
+            pipelines[name].close()
+            root.handlers[:] = []
+        return install, uninstall
+
+    print(f"{'setup':<24}{'records':>9}{'written':>9}{'caller ms':>12}{'us/record':>12}{'flushed ms':>12}")
+    measure('synchronous text', args, install_sync, uninstall_sync)
+    measure('queued json', args, *queued('unlimited', {}))
+    measure('queued json, limited', args, *queued('limited', DEFAULT_RATE_LIMITS))
+
+
+if __name__ == '__main__':
+    main()
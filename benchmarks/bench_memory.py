@@ -0,0 +1,121 @@
+"""Steady-state cache memory of the lean and full client profiles.
+
+Feeds discord.py's real connection state the gateway traffic each profile
+would receive: guild creates with their members (and presences, for the full
+profile's intents), followed by a stream of messages. Memory held by the
+caches is measured with tracemalloc. No network is involved. Run from the
+repo root:
+
+    python -m benchmarks.bench_memory --guilds 5 --members 20000 --messages 5000
+"""
+import argparse
+import asyncio
+import gc
+import itertools
+import tracemalloc
+
+import discord
+from discord.ext import commands
+
+from utils.intents import client_options
+
+BOT_ID = 1
+
+
+def user_payload(user_id: int) -> dict:
+    return {'id': str(user_id), 'username': f"user{user_id}", 'discriminator': '0', 'avatar': None, 'global_name': None}
+
+
+def guild_payload(guild_id: int, channel_id: int, member_ids, with_members: bool, with_presences: bool) -> dict:
+    members = member_ids if with_members else [BOT_ID]
+    data = {
+        'id': str(guild_id),
+        'name': f"guild{guild_id}",
+        'owner_id': str(BOT_ID),
+        'member_count': len(member_ids),
+        'roles': [{'id': str(guild_id), 'name': '@everyone', 'permissions': '0', 'position': 0, 'color': 0,
+                   'hoist': False, 'managed': False, 'mentionable': False, 'flags': 0}],
+        'emojis': [],
+        'stickers': [],
+        'features': [],
+        'channels': [{'id': str(channel_id), 'type': 0, 'name': 'jokes', 'position': 0, 'permission_overwrites': []}],
+        'threads': [],
+        'members': [
+            {'user': user_payload(member_id), 'roles': [], 'joined_at': '2024-01-01T00:00:00+00:00',
+             'deaf': False, 'mute': False, 'flags': 0}
+            for member_id in members
+        ],
+    }
+    if with_presences:
+        data['presences'] = [
+            {'user': {'id': str(member_id)}, 'status': 'online', 'activities': [], 'client_status': {'desktop': 'online'}}
+            for member_id in member_ids
+        ]
+    return data
+
+
+def message_payload(message_id: int, channel_id: int, guild_id: int, author_id: int) -> dict:
+    return {
+        'id': str(message_id), 'channel_id': str(channel_id), 'guild_id': str(guild_id), 'type': 0,
+        'content': f"Punchline {message_id}", 'author': user_payload(author_id),
+        'member': {'roles': [], 'joined_at': '2024-01-01T00:00:00+00:00', 'deaf': False, 'mute': False, 'flags': 0},
+        'attachments': [], 'embeds': [], 'mentions': [], 'mention_roles': [], 'pinned': False,
+        'mention_everyone': False, 'tts': False, 'timestamp': '2024-01-01T00:00:00+00:00', 'edited_timestamp': None,
+        'flags': 0, 'components': [],
+    }
+
+
+async def measure(profile: str, args) -> int:
+    options = client_options(profile)
+    intents = options['intents']
+    bot = commands.Bot(command_prefix='!', **options)
+    state = bot._connection
+    state.user = discord.ClientUser(state=state, data={**user_payload(BOT_ID), 'bot': True})
+    state.dispatch = lambda *a, **k: None
+    ids = itertools.count(10 ** 17)
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    guilds = []
+    for _ in range(args.guilds):
+        guild_id, channel_id = next(ids), next(ids)
+        member_ids = [BOT_ID] + [next(ids) for _ in range(args.members)]
+        state._add_guild_from_data(
+            guild_payload(guild_id, channel_id, member_ids, intents.members, intents.presences)
+        )
+        guilds.append((guild_id, channel_id, member_ids))
+    for i in range(args.messages):
+        guild_id, channel_id, member_ids = guilds[i % len(guilds)]
+        state.parse_message_create(message_payload(next(ids), channel_id, guild_id, member_ids[1 + i % args.members]))
+
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    members = sum(len(guild.members) for guild in bot.guilds)
+    print(
+        f"{profile:<5} intents={intents.value:<8} cached members={members:<8} "
+        f"cached messages={len(state._messages or [])!s:<6} users={len(state._users):<8} memory={held / 2 ** 20:8.1f} MiB"
+    )
+    await bot.close()
+    return held
+
+
+async def run(args):
+    full = await measure('full', args)
+    lean = await measure('lean', args)
+    print(f"lean profile holds {lean / max(full, 1):.1%} of the full profile's cache memory")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--guilds', type=int, default=3)
+    parser.add_argument('--members', type=int, default=10000, help='members per guild')
+    parser.add_argument('--messages', type=int, default=3000)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
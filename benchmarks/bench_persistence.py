@@ -0,0 +1,93 @@
+"""Submissions per second with the state store enabled vs disabled.
+
+Drives JokeCompetition's submission bookkeeping (the part of ``on_message``
+that touches state) without a Discord connection. Run from the repo root:
+
+    python -m benchmarks.bench_persistence [submissions]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from cogs.joke_competition import JokeCompetition
+from utils.archive import CompetitionArchive
+from utils.metrics import Metrics
+from utils.ratelimit import SubmissionLimiter
+from utils.scheduler import DeadlineScheduler
+from utils.sharding import ShardPartition
+from utils.store import StateStore
+
+THREADS = 20
+
+
+async def run(store: StateStore, submissions: int):
+    await store.open()
+    bot = SimpleNamespace(
+        scheduler=DeadlineScheduler(), store=store, archive=CompetitionArchive(None), spool=None,
+        metrics=Metrics(), partition=ShardPartition(), submission_limiter=SubmissionLimiter({})
+    )
+    cog = JokeCompetition(bot)
+
+    now = datetime.now().astimezone()
+    for thread_id in range(1, THREADS + 1):
+        cog.active_competitions[thread_id] = {
+            'setup': f"Setup {thread_id}",
+            'start_time': now,
+            'end_time': now + timedelta(hours=1),
+            'channel_id': 0,
+            'phase': 'submission',
+            'setup_reference': f"Setup {thread_id}",
+        }
+        cog.submissions[thread_id] = {}
+        cog.punchline_messages[thread_id] = []
+        cog.vote_counts[thread_id] = {}
+        cog._persist_competition(thread_id)
+
+    start = time.perf_counter()
+    for i in range(submissions):
+        thread_id = i % THREADS + 1
+        number = len(cog.submissions[thread_id]) + 1
+        cog._store_submission(thread_id, number, {
+            'punchline': f"Punchline number {i} with a bit of text to make it realistic",
+            'user_id': 100000 + i % 500,
+            'has_image': False,
+            'attachments': [],
+        })
+        cog._store_punchline(thread_id, {
+            'message_id': 10 ** 12 + i,
+            'submission_number': number,
+            'punchline': f"Punchline number {i} with a bit of text to make it realistic",
+            'has_image': False,
+        })
+        # Yield like the event loop would between gateway events
+        if i % 50 == 0:
+            await asyncio.sleep(0)
+    hot_path = time.perf_counter() - start
+
+    await store.close()
+    durable = time.perf_counter() - start
+    bot.scheduler.close()
+    return hot_path, durable
+
+
+def main():
+    submissions = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            'off': asyncio.run(run(StateStore(None), submissions)),
+            'on': asyncio.run(run(StateStore(os.path.join(tmp, 'bench.db')), submissions)),
+        }
+    print(f"{submissions} submissions across {THREADS} threads")
+    for mode, (hot_path, durable) in results.items():
+        print(
+            f"persistence {mode:>3}: {submissions / hot_path:>10.0f} submissions/s on the event loop, "
+            f"{submissions / durable:>10.0f} submissions/s until durable"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Gateway event throughput with 1 shard vs N shards, in one or several processes.
+
+Every guild gets a running competition. Each worker process owns a range of
+shards, like a ``SHARD_IDS`` deployment. It only sees the events of its own
+guilds, as the gateway would deliver them, and pushes submissions and
+votes through the real JokeCompetition listeners. Run from the repo root:
+
+    python -m benchmarks.bench_shards --shards 4 --processes 4 --guilds 40
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import random
+import time
+
+import discord
+
+from benchmarks.fake_discord import FakeBot, FakeDiscord, FakeGuild, FakeInteraction, FakeMessage, FakeUser, fake_text
+from cogs.joke_competition import JokeCompetition
+from utils.sharding import ShardPartition, shard_for
+
+
+def guild_ids(count: int):
+    # Snowflakes carry their timestamp in the high bits; spread guilds across shards like real IDs
+    return [((i + 1) << 22) | i for i in range(count)]
+
+
+async def run_worker(shard_count: int, shard_ids, args):
+    partition = ShardPartition(shard_count, shard_ids)
+    hub = FakeDiscord(args.rest_latency_ms / 1000)
+    bot = FakeBot(hub, partition=partition)
+    cog = JokeCompetition(bot)
+    await bot.add_cog(cog)
+    moderator = FakeUser(hub, hub.next_id(), 'moderator', permissions=discord.Permissions(manage_messages=True))
+    users = [FakeUser(hub, hub.next_id(), f"user{i}") for i in range(args.users)]
+    rng = random.Random(args.seed)
+
+    threads = []
+    for guild_id in guild_ids(args.guilds):
+        if not partition.owns(guild_id):
+            continue
+        guild = FakeGuild(hub, f"guild-{guild_id}", guild_id)
+        guild.me = bot.user
+        channel = guild.add_text_channel('jokes')
+        guild.add_text_channel('script-discussions')
+        await cog.startjoke.callback(cog, FakeInteraction(hub, moderator, channel), "now", "2h", f"Setup for {guild_id}")
+        await bot.drain_events()
+        threads.append(channel.threads[-1])
+
+    start = time.perf_counter()
+    events = 0
+    for _ in range(args.submissions):
+        for thread in threads:
+            bot.dispatch('message', FakeMessage(hub, thread, rng.choice(users), f"Punchline {events}: {fake_text(events)}"))
+            events += 1
+        await bot.drain_events()
+
+    reposts = [[m for m in thread.sent if m.content.startswith("**Punchline")] for thread in threads]
+    for _ in range(args.votes):
+        for thread_reposts in reposts:
+            hub.react(rng.choice(thread_reposts), rng.choice(users))
+            events += 1
+        await bot.drain_events()
+    elapsed = time.perf_counter() - start
+    await bot.close()
+    return len(threads), events, elapsed
+
+
+def worker(shard_count: int, shard_ids, args):
+    logging.basicConfig(level=logging.WARNING)
+    return asyncio.run(run_worker(shard_count, shard_ids, args))
+
+
+def split(shard_count: int, processes: int):
+    """Contiguous shard ranges, one per process"""
+    per = -(-shard_count // processes)
+    return [list(range(first, min(first + per, shard_count))) for first in range(0, shard_count, per)]
+
+
+def measure(shard_count: int, processes: int, args):
+    ranges = split(shard_count, processes)
+    wall_start = time.perf_counter()
+    if len(ranges) == 1:
+        results = [worker(shard_count, ranges[0], args)]
+    else:
+        with multiprocessing.get_context('spawn').Pool(len(ranges)) as pool:
+            results = pool.starmap(worker, [(shard_count, shard_ids, args) for shard_ids in ranges])
+    wall = time.perf_counter() - wall_start
+    events = sum(result[1] for result in results)
+    # Workers run side by side, so the slowest one bounds the throughput
+    busiest = max(result[2] for result in results)
+    guilds_per_process = "/".join(str(result[0]) for result in results)
+    print(
+        f"{shard_count:>6} {len(ranges):>9}  {guilds_per_process:<16}{events:>9}"
+        f"{busiest:>10.2f}{events / busiest:>14.0f}{wall:>9.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shards', type=int, default=4)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--guilds', type=int, default=40)
+    parser.add_argument('--submissions', type=int, default=100, help='submissions per guild')
+    parser.add_argument('--votes', type=int, default=200, help='votes per guild')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--rest-latency-ms', type=float, default=0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    spread = [0] * args.shards
+    for guild_id in guild_ids(args.guilds):
+        spread[shard_for(guild_id, args.shards)] += 1
+    print(f"{args.guilds} guilds over {args.shards} shards: {spread}")
+    print(f"{'shards':>6} {'processes':>9}  {'guilds/process':<16}{'events':>9}{'busy s':>10}{'events/s':>14}{'wall s':>9}")
+    measure(1, 1, args)
+    measure(args.shards, 1, args)
+    measure(args.shards, args.processes, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Throughput of JokeCompetition.on_message under a burst of submissions.
+
+Fires a burst of concurrent submissions (a share of them with an image) at one
+competition thread through the real cog code, against the offline stand-ins
+with simulated REST and download latency. Run from the repo root:
+
+    python -m benchmarks.bench_submissions [burst] [rest_latency_ms] [download_latency_ms]
+"""
+import asyncio
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from benchmarks.fake_discord import FakeAttachment, FakeBot, FakeDiscord, FakeGuild, FakeMessage, FakeUser, fake_text
+from cogs.joke_competition import JokeCompetition
+
+IMAGE_EVERY = 4
+
+
+async def run(burst: int, rest_latency: float, download_latency: float):
+    hub = FakeDiscord(rest_latency=rest_latency, download_latency=download_latency)
+    bot = FakeBot(hub)
+    cog = JokeCompetition(bot)
+    channel = FakeGuild(hub).add_text_channel('jokes')
+    now = datetime.now().astimezone()
+    thread_id = await cog.create_competition(
+        SimpleNamespace(channel=channel), "Why did the benchmark cross the road?", now, now + timedelta(hours=1)
+    )
+    thread = hub.channels[thread_id]
+    users = [FakeUser(hub, hub.next_id(), f"user{i}") for i in range(50)]
+
+    messages = []
+    for i in range(burst):
+        attachments = [FakeAttachment(hub, f"{i}.png", b'\x89PNG' + bytes(2048))] if i % IMAGE_EVERY == 0 else []
+        messages.append(FakeMessage(hub, thread, users[i % len(users)], f"Punchline {i}: {fake_text(i)}", attachments))
+
+    hub.rest_calls.clear()
+    start = time.perf_counter()
+    await asyncio.gather(*(cog.on_message(message) for message in messages))
+    elapsed = time.perf_counter() - start
+
+    numbers = [int(re.match(r"\*\*Punchline #(\d+)", m.content).group(1))
+               for m in thread.sent if m.content.startswith("**Punchline")]
+    await bot.close()
+    return elapsed, numbers, dict(hub.rest_calls)
+
+
+def main():
+    burst = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rest_latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 40) / 1000
+    download_latency = (float(sys.argv[3]) if len(sys.argv) > 3 else 120) / 1000
+
+    elapsed, numbers, rest_calls = asyncio.run(run(burst, rest_latency, download_latency))
+    print(f"burst of {burst} submissions, {rest_latency * 1000:.0f}ms REST, {download_latency * 1000:.0f}ms downloads")
+    print(f"  {elapsed:.2f}s total, {burst / elapsed:.1f} submissions/s")
+    print(f"  posted in number order: {numbers == sorted(numbers)}, unique numbers: {len(set(numbers)) == len(numbers)}")
+    print(f"  REST calls: {rest_calls}")
+
+
+if __name__ == '__main__':
+    main()
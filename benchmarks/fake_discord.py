@@ -0,0 +1,491 @@
+"""Offline stand-ins for the parts of discord.py the cogs touch.
+
+Every coroutine that would be a REST call goes through ``FakeDiscord.rest``,
+which applies the configured latency and per-bucket rate limits and counts
+the call, both per route and per benchmark operation. Bot reactions and
+simulated user votes are dispatched back to the cogs as raw reaction events,
+as the gateway would. This lets benchmarks drive the real cog code without a
+gateway connection.
+"""
+import asyncio
+import contextvars
+import io
+import itertools
+import random
+import string
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Optional, Tuple
+
+import discord
+
+from utils.archive import CompetitionArchive
+from utils.interactions import JobQueue
+from utils.metrics import Metrics
+from utils.ratelimit import SubmissionLimiter
+from utils.scheduler import DeadlineScheduler
+from utils.sharding import ShardPartition
+from utils.spool import AttachmentSpool
+from utils.store import StateStore
+
+# Benchmark operation the current task is working on, for REST attribution
+current_operation = contextvars.ContextVar('current_operation', default='other')
+
+
+class FakeDiscord:
+    """Shared ID allocator, REST model and call counters for the fakes.
+
+    ``rate_limit`` is ``(requests, per_seconds)`` applied to each bucket
+    (route plus channel), roughly like Discord's per-channel message limits.
+    """
+
+    def __init__(
+        self,
+        rest_latency: float = 0.0,
+        download_latency: float = 0.0,
+        rate_limit: Optional[Tuple[int, float]] = None,
+    ):
+        self.rest_latency = rest_latency
+        self.download_latency = download_latency
+        self.rate_limit = rate_limit
+        self.rest_calls = Counter()
+        self.rest_by_operation = defaultdict(Counter)
+        self.rate_limit_wait = 0.0
+        self._buckets = {}
+        self._ids = itertools.count(10 ** 17)
+        self.channels = {}
+        self.users = {}
+        self.cdn = {}
+        self.bot = None
+        self.bot_user = None
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    async def rest(self, route: str, bucket=None) -> None:
+        self.rest_calls[route] += 1
+        self.rest_by_operation[current_operation.get()][route] += 1
+        if self.rate_limit and bucket is not None:
+            await self._acquire((route, bucket))
+        if self.rest_latency:
+            await asyncio.sleep(self.rest_latency)
+
+    async def _acquire(self, key) -> None:
+        limit, per = self.rate_limit
+        while True:
+            now = time.monotonic()
+            window_start, used = self._buckets.get(key, (now, 0))
+            if now - window_start >= per:
+                window_start, used = now, 0
+            if used < limit:
+                self._buckets[key] = (window_start, used + 1)
+                return
+            wait = window_start + per - now
+            self.rate_limit_wait += wait
+            await asyncio.sleep(wait)
+
+    async def fetch_url(self, url: str, chunk_size: int = 64 * 1024):
+        """Stand-in for streaming an attachment from the CDN"""
+        await self.rest('attachment.download')
+        if self.download_latency:
+            await asyncio.sleep(self.download_latency)
+        data = self.cdn[url]
+        for offset in range(0, len(data), chunk_size):
+            yield data[offset:offset + chunk_size]
+
+    def react(self, message, user, emoji: str = "⭐", add: bool = True) -> None:
+        """A user (un)reacting; the gateway event is dispatched to the bot"""
+        message._apply_reaction(emoji, 1 if add else -1)
+        if self.bot is not None:
+            self.bot.dispatch_raw_reaction(message, user, emoji, add)
+
+    def clear_reactions(self, message, emoji: Optional[str] = None) -> None:
+        """A moderator removing every reaction, or every one of ``emoji``, from a message"""
+        message._clear_reactions(emoji)
+        if self.bot is not None:
+            self.bot.dispatch_raw_reaction_clear(message, emoji)
+
+
+class FakeUser:
+    def __init__(self, hub: FakeDiscord, user_id: int, name: str, bot: bool = False, permissions=None):
+        self.hub = hub
+        self.id = user_id
+        self.name = name
+        self.bot = bot
+        self.mention = f"<@{user_id}>"
+        self.guild_permissions = permissions or discord.Permissions.none()
+        self.dms = []
+        hub.users[user_id] = self
+
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    async def send(self, content=None, **kwargs):
+        await self.hub.rest('dm.send', self.id)
+        self.dms.append(content)
+
+
+class FakeAttachment:
+    def __init__(self, hub: FakeDiscord, filename: str, data: bytes, content_type: str = 'image/png'):
+        self.hub = hub
+        self.id = hub.next_id()
+        self.filename = filename
+        self.content_type = content_type
+        self.size = len(data)
+        self.url = f"https://cdn.example/{self.id}/{filename}"
+        self.data = data
+        hub.cdn[self.url] = data
+
+    async def read(self) -> bytes:
+        await self.hub.rest('attachment.download')
+        if self.hub.download_latency:
+            await asyncio.sleep(self.hub.download_latency)
+        return self.data
+
+    async def to_file(self) -> discord.File:
+        return discord.File(io.BytesIO(await self.read()), filename=self.filename)
+
+
+class FakeReaction:
+    def __init__(self, emoji: str, count: int = 0):
+        self.emoji = emoji
+        self.count = count
+
+
+class FakeMessage:
+    def __init__(self, hub: FakeDiscord, channel, author, content='', attachments=None, files=None, embeds=None):
+        self.hub = hub
+        self.id = hub.next_id()
+        self.channel = channel
+        self.guild = getattr(channel, 'guild', None)
+        self.author = author
+        self.content = content or ''
+        self.attachments = list(attachments or [])
+        self.files = list(files or [])
+        self.embeds = list(embeds or [])
+        self.reactions = []
+        self.deleted = False
+        self.created_at = datetime.now(timezone.utc)
+
+    @property
+    def jump_url(self):
+        return f"https://discord.example/channels/{self.channel.id}/{self.id}"
+
+    async def delete(self):
+        await self.hub.rest('message.delete', self.channel.id)
+        self.deleted = True
+        self.channel.messages.pop(self.id, None)
+
+    def _apply_reaction(self, emoji: str, delta: int) -> None:
+        for reaction in self.reactions:
+            if str(reaction.emoji) == emoji:
+                reaction.count = max(0, reaction.count + delta)
+                return
+        if delta > 0:
+            self.reactions.append(FakeReaction(emoji, delta))
+
+    def _clear_reactions(self, emoji: Optional[str] = None) -> None:
+        self.reactions = [reaction for reaction in self.reactions if emoji is not None and str(reaction.emoji) != emoji]
+
+    async def add_reaction(self, emoji):
+        await self.hub.rest('message.add_reaction', self.channel.id)
+        self.hub.react(self, self.hub.bot_user, emoji)
+
+    async def create_thread(self, *, name, **kwargs):
+        return await self.channel.create_thread_from(self, name)
+
+
+class _FakeMessageable:
+    async def send(self, content=None, *, files=None, file=None, embeds=None, embed=None, **kwargs):
+        await self.hub.rest(f"{self.kind}.send", self.id)
+        if file is not None:
+            files = [file]
+        if embed is not None:
+            embeds = [embed]
+        # Uploads come back as the message's own attachments, on new CDN URLs
+        attachments = [FakeAttachment(self.hub, f.filename, f.fp.read()) for f in files or []]
+        message = FakeMessage(self.hub, self, self.hub.bot_user, content, attachments, files, embeds)
+        self.messages[message.id] = message
+        self.sent.append(message)
+        return message
+
+    async def delete_messages(self, messages):
+        messages = list(messages)
+        if len(messages) == 1:
+            await messages[0].delete()
+            return
+        await self.hub.rest(f"{self.kind}.bulk_delete", self.id)
+        for message in messages:
+            message.deleted = True
+            self.messages.pop(message.id, None)
+
+    async def fetch_message(self, message_id):
+        await self.hub.rest(f"{self.kind}.fetch_message", self.id)
+        try:
+            return self.messages[message_id]
+        except KeyError:
+            raise discord.NotFound(SimpleNamespace(status=404, reason='Not Found'), 'Unknown Message')
+
+    async def history(self, limit=100, **kwargs):
+        messages = list(reversed(list(self.messages.values())))
+        if limit is not None:
+            messages = messages[:limit]
+        # One REST call per page of 100, like the real paginated endpoint
+        for offset in range(0, max(len(messages), 1), 100):
+            await self.hub.rest(f"{self.kind}.history", self.id)
+            for message in messages[offset:offset + 100]:
+                yield message
+
+    def permissions_for(self, member):
+        return discord.Permissions.all()
+
+
+def fake_text(seed: int, words: int = 8) -> str:
+    """Random but reproducible words, so generated setups and punchlines aren't near-duplicates"""
+    rng = random.Random(seed)
+    return ' '.join(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8))) for _ in range(words))
+
+
+class FakeGuild:
+    def __init__(self, hub: FakeDiscord, name: str = 'guild', guild_id: Optional[int] = None):
+        self.hub = hub
+        self.id = guild_id or hub.next_id()
+        self.name = name
+        self.text_channels = []
+        self.me = None
+        self.filesize_limit = 10 * 1024 * 1024
+
+    def add_text_channel(self, name: str) -> 'FakeTextChannel':
+        channel = FakeTextChannel(self.hub, name, self)
+        self.text_channels.append(channel)
+        return channel
+
+    def get_channel(self, channel_id):
+        return self.hub.channels.get(channel_id)
+
+
+class FakeThread(_FakeMessageable, discord.Thread):
+    """Passes ``isinstance(channel, discord.Thread)`` without a gateway state"""
+    kind = 'thread'
+
+    def __init__(self, hub: FakeDiscord, name: str, parent, guild=None):
+        self.hub = hub
+        self.id = hub.next_id()
+        self.name = name
+        self.parent_channel = parent
+        self.guild = guild
+        self.locked = False
+        self.messages = {}
+        self.sent = []
+        hub.channels[self.id] = self
+
+    async def edit(self, *, locked=None, **kwargs):
+        await self.hub.rest('thread.edit', self.id)
+        if locked is not None:
+            self.locked = locked
+        return self
+
+    @property
+    def jump_url(self):
+        return f"https://discord.example/channels/{self.id}"
+
+
+class FakeTextChannel(_FakeMessageable):
+    kind = 'channel'
+
+    def __init__(self, hub: FakeDiscord, name: str, guild=None):
+        self.hub = hub
+        self.id = hub.next_id()
+        self.name = name
+        self.guild = guild
+        self.position = len(guild.text_channels) if guild else 0
+        self.messages = {}
+        self.sent = []
+        self.threads = []
+        hub.channels[self.id] = self
+
+    @property
+    def jump_url(self):
+        return f"https://discord.example/channels/{self.id}"
+
+    async def create_thread_from(self, message, name):
+        await self.hub.rest('message.create_thread', self.id)
+        thread = FakeThread(self.hub, name, self, self.guild)
+        self.threads.append(thread)
+        return thread
+
+
+class FakeInteractionResponse:
+    def __init__(self, interaction: 'FakeInteraction'):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def send_message(self, content=None, *, ephemeral=False, **kwargs):
+        if self._done:
+            raise discord.InteractionResponded(self._interaction)
+        await self._interaction.hub.rest('interaction.respond')
+        self._done = True
+        self._interaction.responses.append(content)
+
+    async def defer(self, *, ephemeral=False, thinking=False):
+        if self._done:
+            raise discord.InteractionResponded(self._interaction)
+        await self._interaction.hub.rest('interaction.respond')
+        self._done = True
+
+
+class FakeFollowup:
+    def __init__(self, interaction: 'FakeInteraction'):
+        self._interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        await self._interaction.hub.rest('interaction.followup')
+        self._interaction.responses.append(content)
+
+
+class FakeInteraction:
+    def __init__(self, hub: FakeDiscord, user: FakeUser, channel, guild: Optional[FakeGuild] = None):
+        self.hub = hub
+        self.id = hub.next_id()
+        self.user = user
+        self.channel = channel
+        self.channel_id = channel.id
+        self.guild = guild or getattr(channel, 'guild', None)
+        self.guild_id = getattr(self.guild, 'id', None)
+        self.created_at = datetime.now(timezone.utc)
+        self.extras = {}
+        self.responses = []
+        self.response = FakeInteractionResponse(self)
+        self.followup = FakeFollowup(self)
+
+    async def edit_original_response(self, *, content=None, **kwargs):
+        await self.hub.rest('interaction.edit')
+        self.responses.append(content)
+
+
+class FakeCommandTree:
+    """Holds the commands cogs add by hand, e.g. context menus"""
+
+    def __init__(self):
+        self.commands = {}
+
+    def add_command(self, command, *, override=False):
+        self.commands[(command.name, command.type)] = command
+
+    def remove_command(self, name, *, type=discord.AppCommandType.chat_input):
+        return self.commands.pop((name, type), None)
+
+
+class FakeBot:
+    """Just enough of ``ResilientBot`` for the cogs' constructors, lookups and listeners"""
+
+    def __init__(self, hub: FakeDiscord, store: StateStore = None, partition: ShardPartition = None):
+        self.hub = hub
+        self.user = FakeUser(hub, hub.next_id(), 'sketchy-bot', bot=True)
+        hub.bot_user = self.user
+        hub.bot = self
+        self.scheduler = DeadlineScheduler()
+        self.store = store or StateStore(None)
+        self.archive = CompetitionArchive(None)
+        self.spool = AttachmentSpool(fetch=hub.fetch_url)
+        self.metrics = Metrics()
+        # Unlimited unless a benchmark sets its own, so load tests measure the cogs rather than the limiter
+        self.submission_limiter = SubmissionLimiter({})
+        self.jobs = JobQueue(self.metrics)
+        self.partition = partition or ShardPartition()
+        self.cog_handoff = {}
+        self.tree = FakeCommandTree()
+        self.cogs = {}
+        self._listeners = defaultdict(list)
+        self._event_tasks = set()
+
+    async def add_cog(self, cog) -> None:
+        await discord.utils.maybe_coroutine(cog.cog_load)
+        self.cogs[cog.qualified_name] = cog
+        for name, method in cog.get_listeners():
+            self._listeners[name].append(method)
+
+    def get_cog(self, name):
+        return self.cogs.get(name)
+
+    def get_channel(self, channel_id):
+        return self.hub.channels.get(channel_id)
+
+    def get_user(self, user_id):
+        return self.hub.users.get(user_id)
+
+    async def fetch_user(self, user_id):
+        await self.hub.rest('user.fetch')
+        return self.hub.users[user_id]
+
+    async def fetch_channel(self, channel_id):
+        await self.hub.rest('channel.fetch')
+        return self.hub.channels[channel_id]
+
+    async def wait_until_ready(self):
+        return None
+
+    def spawn(self, coro) -> asyncio.Task:
+        """Run ``coro`` as a tracked event task that ``drain_events`` waits for"""
+        task = asyncio.create_task(coro)
+        self._event_tasks.add(task)
+        task.add_done_callback(self._event_tasks.discard)
+        return task
+
+    def dispatch(self, event: str, *args) -> None:
+        """Run every ``on_<event>`` listener in its own task, like discord.py"""
+        for listener in self._listeners.get(f"on_{event}", []):
+            self.spawn(listener(*args))
+
+    def dispatch_raw_reaction(self, message, user, emoji: str, add: bool) -> None:
+        payload = SimpleNamespace(
+            message_id=message.id,
+            channel_id=message.channel.id,
+            guild_id=getattr(message.guild, 'id', None),
+            user_id=user.id,
+            emoji=discord.PartialEmoji(name=emoji),
+            event_type='REACTION_ADD' if add else 'REACTION_REMOVE',
+        )
+        self.dispatch('raw_reaction_add' if add else 'raw_reaction_remove', payload)
+
+    def dispatch_raw_reaction_clear(self, message, emoji: Optional[str] = None) -> None:
+        payload = SimpleNamespace(
+            message_id=message.id,
+            channel_id=message.channel.id,
+            guild_id=getattr(message.guild, 'id', None),
+        )
+        if emoji is None:
+            self.dispatch('raw_reaction_clear', payload)
+        else:
+            payload.emoji = discord.PartialEmoji(name=emoji)
+            self.dispatch('raw_reaction_clear_emoji', payload)
+
+    async def drain_events(self) -> None:
+        """Wait for every listener task and the background jobs of deferred commands"""
+        while self._event_tasks or self.jobs.jobs:
+            await asyncio.gather(*list(self._event_tasks), return_exceptions=True)
+            await self.jobs.drain()
+
+    async def remove_cog(self, name: str):
+        cog = self.cogs.pop(name, None)
+        if cog is None:
+            return None
+        for event, method in cog.get_listeners():
+            self._listeners[event].remove(method)
+        await discord.utils.maybe_coroutine(cog.cog_unload)
+        return cog
+
+    async def close(self):
+        await self.drain_events()
+        for name in list(self.cogs):
+            await self.remove_cog(name)
+        self.scheduler.close()
+        await self.spool.close()
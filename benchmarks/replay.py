@@ -0,0 +1,271 @@
+"""Replay a recorded gateway log into the cogs offline.
+
+Feeds a log written by ``RECORD_EVENTS=<path>`` (see utils/recorder.py) back
+into JokeCompetition, TimerCog and BasicCog on top of the offline stand-ins,
+either at recorded pace (``--speed 1``) or as fast as possible
+(``--speed 0``, the default). Run from the repo root:
+
+    python -m benchmarks.replay events.jsonl.gz --close-at-end --profile replay.prof
+
+The bot's own messages and threads get new IDs during replay. Recorded bot
+messages and bot-created threads are lined up with the replayed ones in
+order, per channel, so later reactions and messages reach the right objects.
+"""
+import argparse
+import asyncio
+import cProfile
+import gzip
+import json
+import logging
+import time
+from collections import Counter
+from typing import Dict, Iterator
+
+import discord
+
+from benchmarks.fake_discord import (
+    FakeAttachment, FakeBot, FakeDiscord, FakeGuild, FakeInteraction, FakeMessage, FakeUser
+)
+from cogs.basic import BasicCog
+from cogs.joke_competition import JokeCompetition
+from cogs.timer import TimerCog
+
+# Attachment bodies are not recorded; replayed ones are zero-filled up to this size
+MAX_REPLAY_ATTACHMENT_BYTES = 8 * 1024 * 1024
+
+APPLICATION_COMMAND = 2
+CHAT_INPUT = 1
+OPTION_USER = 6
+OPTION_ATTACHMENT = 11
+
+
+def read_log(path: str) -> Iterator[Dict]:
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as fh:
+        for line in fh:
+            if line.strip():
+                yield json.loads(line)
+
+
+class ReplayEngine:
+    def __init__(self, bot: FakeBot, speed: float = 0.0):
+        self.bot = bot
+        self.hub = bot.hub
+        self.speed = speed
+        self.stats = Counter()
+        self.recorded_bot_id = None
+        self.guilds: Dict[str, FakeGuild] = {}
+        self.channels = {}
+        self.messages = {}
+        self.users: Dict[str, FakeUser] = {}
+        # How many of each fake channel's bot messages / threads are already mapped
+        self._aligned_messages = Counter()
+        self._aligned_threads = Counter()
+
+    def guild(self, guild_id) -> FakeGuild:
+        if guild_id not in self.guilds:
+            guild = FakeGuild(self.hub, f"guild-{guild_id}")
+            guild.me = self.bot.user
+            guild.add_text_channel('script-discussions')
+            self.guilds[guild_id] = guild
+        return self.guilds[guild_id]
+
+    def channel(self, channel_id, guild_id):
+        if channel_id not in self.channels:
+            self.channels[channel_id] = self.guild(guild_id).add_text_channel(f"channel-{channel_id}")
+        return self.channels[channel_id]
+
+    def user(self, data: Dict, permissions=None) -> FakeUser:
+        user = self.users.get(data['id'])
+        if user is None:
+            user = FakeUser(self.hub, self.hub.next_id(), data.get('username') or data['id'], bot=data.get('bot', False))
+            self.users[data['id']] = user
+        if permissions is not None:
+            user.guild_permissions = discord.Permissions(int(permissions))
+        return user
+
+    def attachment(self, data: Dict) -> FakeAttachment:
+        size = min(int(data.get('size') or 0), MAX_REPLAY_ATTACHMENT_BYTES)
+        return FakeAttachment(self.hub, data.get('filename') or 'file', bytes(size), data.get('content_type') or '')
+
+    async def run(self, records) -> None:
+        started = time.perf_counter()
+        first_t = None
+        for record in records:
+            if record['e'] == 'HEADER':
+                self.recorded_bot_id = record['d']['bot_id']
+                continue
+            if first_t is None:
+                first_t = record['t']
+            if self.speed > 0:
+                delay = (record['t'] - first_t) / self.speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            handler = getattr(self, f"on_{record['e'].lower()}", None)
+            if handler is None:
+                self.stats['skipped'] += 1
+                continue
+            await handler(record['d'])
+            self.stats[record['e']] += 1
+        await self.bot.drain_events()
+
+    async def _resolve(self, lookup):
+        """Retry a lookup once after letting in-flight handlers catch up"""
+        found = lookup()
+        if found is None:
+            await self.bot.drain_events()
+            found = lookup()
+        return found
+
+    async def on_thread_create(self, data):
+        if data.get('owner_id') != self.recorded_bot_id:
+            self.stats['foreign_threads'] += 1
+            return
+        parent = self.channel(data['parent_id'], data.get('guild_id'))
+
+        def next_thread():
+            index = self._aligned_threads[parent.id]
+            return parent.threads[index] if index < len(parent.threads) else None
+
+        thread = await self._resolve(next_thread)
+        if thread is None:
+            self.stats['unaligned_threads'] += 1
+            return
+        self._aligned_threads[parent.id] += 1
+        self.channels[data['id']] = thread
+
+    async def on_message_create(self, data):
+        channel = self.channel(data['channel_id'], data.get('guild_id'))
+        if data['author'] and data['author']['id'] == self.recorded_bot_id:
+            def next_message():
+                index = self._aligned_messages[channel.id]
+                return channel.sent[index] if index < len(channel.sent) else None
+
+            message = await self._resolve(next_message)
+            if message is None:
+                self.stats['unaligned_messages'] += 1
+                return
+            self._aligned_messages[channel.id] += 1
+            self.messages[data['id']] = message
+            return
+
+        author = self.user(data['author'])
+        message = FakeMessage(
+            self.hub, channel, author, data.get('content', ''),
+            [self.attachment(a) for a in data.get('attachments', [])]
+        )
+        self.messages[data['id']] = message
+        self.bot.dispatch('message', message)
+
+    async def _reaction(self, data, add: bool):
+        if data['user_id'] == self.recorded_bot_id:
+            # The replayed bot adds its own reactions
+            return
+        message = await self._resolve(lambda: self.messages.get(data['message_id']))
+        if message is None:
+            self.stats['unknown_reaction_targets'] += 1
+            return
+        user = self.user({'id': data['user_id']})
+        self.hub.react(message, user, data['emoji'].get('name') or '', add)
+
+    async def on_message_reaction_add(self, data):
+        await self._reaction(data, True)
+
+    async def on_message_reaction_remove(self, data):
+        await self._reaction(data, False)
+
+    async def _clear(self, data, emoji=None):
+        message = await self._resolve(lambda: self.messages.get(data['message_id']))
+        if message is None:
+            self.stats['unknown_reaction_targets'] += 1
+            return
+        self.hub.clear_reactions(message, emoji)
+
+    async def on_message_reaction_remove_all(self, data):
+        await self._clear(data)
+
+    async def on_message_reaction_remove_emoji(self, data):
+        await self._clear(data, data['emoji'].get('name') or '')
+
+    def _find_command(self, name: str):
+        for cog in self.bot.cogs.values():
+            for command in cog.get_app_commands():
+                if command.name == name:
+                    return cog, command
+        return None, None
+
+    async def on_interaction_create(self, data):
+        command_data = data['data']
+        if data['type'] != APPLICATION_COMMAND or command_data.get('type', CHAT_INPUT) != CHAT_INPUT:
+            self.stats['unsupported_interactions'] += 1
+            return
+        cog, command = self._find_command(command_data['name'])
+        if command is None:
+            self.stats['unknown_commands'] += 1
+            return
+
+        channel = await self._resolve(lambda: self.channels.get(data['channel_id']))
+        if channel is None:
+            channel = self.channel(data['channel_id'], data.get('guild_id'))
+        user = self.user(data['user'], data.get('permissions'))
+        interaction = FakeInteraction(self.hub, user, channel)
+
+        # Recorded options carry Discord-side names, which may be renamed from the Python ones
+        names = {parameter.display_name: parameter.name for parameter in command.parameters}
+        kwargs = {}
+        for option in command_data.get('options', []):
+            name = names.get(option['name'], option['name'])
+            if option['type'] == OPTION_ATTACHMENT:
+                kwargs[name] = self.attachment(command_data['attachments'][option['value']])
+            elif option['type'] == OPTION_USER:
+                kwargs[name] = self.user({'id': option['value']})
+            else:
+                kwargs[name] = option['value']
+        self.bot.spawn(command.callback(cog, interaction, **kwargs))
+
+
+async def replay(args):
+    hub = FakeDiscord(args.rest_latency_ms / 1000, args.download_latency_ms / 1000)
+    bot = FakeBot(hub)
+    for cog in (JokeCompetition(bot), TimerCog(bot), BasicCog(bot)):
+        await bot.add_cog(cog)
+    engine = ReplayEngine(bot, args.speed)
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    wall_start = time.perf_counter()
+    await engine.run(read_log(args.log))
+    if args.close_at_end:
+        jokes = bot.get_cog('JokeCompetition')
+        await asyncio.gather(*(jokes.close_competition(thread_id) for thread_id in list(jokes.active_competitions)))
+    elapsed = time.perf_counter() - wall_start
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+
+    events = sum(count for key, count in engine.stats.items() if key.isupper())
+    print(f"replayed {events} events in {elapsed:.2f}s ({events / max(elapsed, 1e-9):.0f} events/s)")
+    print("events: " + ", ".join(f"{key}={count}" for key, count in sorted(engine.stats.items())))
+    print("REST calls: " + ", ".join(f"{route}={count}" for route, count in sorted(hub.rest_calls.items())))
+    if profiler:
+        print(f"profile written to {args.profile}")
+    await bot.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('log', help='JSONL (optionally .gz) log written with RECORD_EVENTS')
+    parser.add_argument('--speed', type=float, default=0.0, help='1 = recorded pace, 0 = as fast as possible')
+    parser.add_argument('--close-at-end', action='store_true', help='close every competition still running at the end')
+    parser.add_argument('--rest-latency-ms', type=float, default=0)
+    parser.add_argument('--download-latency-ms', type=float, default=0)
+    parser.add_argument('--profile', metavar='PATH', help='write cProfile stats for the replay to PATH')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    asyncio.run(replay(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,22 +1,203 @@
 import discord
 from discord import app_commands
-from discord.ext import commands, tasks
+from discord.ext import commands
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 import re
+import asyncio
 import logging
+import time
 from typing import Optional
+from utils.deleter import BulkDeleter
+from utils.handoff import hand_off, take_over
+from utils.interactions import deferred
+from utils.pipeline import SubmissionPipeline
+from utils.results import MEDALS, ResultsRenderer
+from utils.similarity import normalize_text, signature
+from utils.users import user_mention
 
 logger = logging.getLogger('discord')
 
+# Submissions per thread that may be downloading/posting at the same time
+MAX_IN_FLIGHT_SUBMISSIONS = 8
+# Competitions that may be closing (tallying and posting results) at once
+MAX_CONCURRENT_CLOSES = 4
+# A failed close is retried this many times, CLOSE_RETRY_DELAY seconds apart
+MAX_CLOSE_ATTEMPTS = 3
+CLOSE_RETRY_DELAY = 60
+# Messages that reach a closing thread are deleted in batches collected over this many seconds
+STRAGGLER_DELETE_WINDOW = 2.0
+# A throttled author is told to slow down at most once per this many seconds
+COOLDOWN_NOTICE_INTERVAL = 30
+# Punchlines shorter than this (once normalized) are never treated as duplicates
+MIN_DUPLICATE_CHARS = 12
+
+# In-memory state carried over to the new instance when the extension is reloaded
+HANDOFF_STATE = (
+    'active_competitions', 'submissions', 'punchline_messages', 'setup_references', 'guild_competitions',
+    'vote_counts', 'stale_tallies', 'scheduled_competitions', 'pipelines', 'close_slots',
+    'punchline_index', 'author_submissions',
+)
+SCHEDULED_KINDS = ('competition_start', 'competition_end')
+
 class JokeCompetition(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.active_competitions = {}
         self.submissions = {}
         self.punchline_messages = {}
+        # (guild ID, setup reference) -> thread ID, so similar setups only clash within a guild
         self.setup_references = {}
-        self.check_competitions.start()
+        # Guild ID -> IDs of its active competition threads
+        self.guild_competitions = {}
+        # Live ⭐ tally per thread, keyed by punchline message ID
+        self.vote_counts = {}
+        # Threads whose tally may have missed reaction events
+        self.stale_tallies = set()
+        # Competitions waiting for their start time, keyed by scheduling ID
+        self.scheduled_competitions = {}
+        # Per-thread ordered submission pipelines
+        self.pipelines = {}
+        # Repost message ID -> (thread ID, submission number)
+        self.punchline_index = {}
+        # (guild ID, user ID) -> [(thread ID, submission number), ...] in submission order
+        self.author_submissions = {}
+        self.close_slots = asyncio.Semaphore(MAX_CONCURRENT_CLOSES)
+        self.stragglers = BulkDeleter(STRAGGLER_DELETE_WINDOW)
+        self.scheduler = bot.scheduler
+        self.store = bot.store
+        self.archive = bot.archive
+        self.spool = bot.spool
+        self.metrics = bot.metrics
+        self.partition = bot.partition
+        self.limiter = bot.submission_limiter
+        # Context menus can't be declared inside a cog, so this one is added to the tree by hand
+        self.lookup_menu = app_commands.default_permissions(manage_messages=True)(
+            app_commands.ContextMenu(name='Who wrote this?', callback=self.lookup_message)
+        )
+
+    async def cog_load(self):
+        """Take over live state on reload, otherwise rebuild it from the persistent store"""
+        self.bot.tree.add_command(self.lookup_menu, override=True)
+        if take_over(self, HANDOFF_STATE, SCHEDULED_KINDS):
+            return
+
+        # Only this process's guilds are restored when shard ranges run in separate processes
+        for comp_id, data in (await self.store.load('scheduled')).items():
+            if not self.partition.owns(data.get('guild_id')):
+                continue
+            self.scheduled_competitions[comp_id] = data
+            self.scheduler.schedule(
+                ('competition_start', comp_id), data['start_time'],
+                self.start_scheduled_competition, comp_id
+            )
+
+        for key, data in (await self.store.load('competitions')).items():
+            if not self.partition.owns(data.get('guild_id')):
+                continue
+            thread_id = int(key)
+            # A close interrupted by the crash is run again, skipping the steps it finished;
+            # intake stays shut for it ('voting' is what older versions stored)
+            data['phase'] = 'closing' if data.get('phase') in ('closing', 'voting') else 'submission'
+            self.active_competitions[thread_id] = data
+            self.submissions[thread_id] = {}
+            self.punchline_messages[thread_id] = []
+            self.vote_counts[thread_id] = {}
+            self._index_competition(thread_id, data)
+            # Reactions that arrived while we were down are only visible in history
+            self.stale_tallies.add(thread_id)
+            self.scheduler.schedule(('competition_end', thread_id), data['end_time'], self.close_competition, thread_id)
+
+        for key, data in (await self.store.load('submissions')).items():
+            thread_id, number = (int(part) for part in key.split(':'))
+            if thread_id in self.submissions:
+                self.submissions[thread_id][number] = data
+
+        for key, msg_data in (await self.store.load('punchlines')).items():
+            thread_id = int(key.split(':')[0])
+            if thread_id in self.punchline_messages:
+                self.punchline_messages[thread_id].append(msg_data)
+                self.vote_counts[thread_id][msg_data['message_id']] = 0
+                self.punchline_index[msg_data['message_id']] = (thread_id, msg_data['submission_number'])
+        for messages in self.punchline_messages.values():
+            messages.sort(key=lambda msg_data: msg_data['submission_number'])
+        for thread_id, submissions in self.submissions.items():
+            self.pipelines[thread_id] = SubmissionPipeline(MAX_IN_FLIGHT_SUBMISSIONS, max(submissions, default=0))
+            guild_id = self.active_competitions[thread_id].get('guild_id')
+            self.archive.setups.add(thread_id, self.active_competitions[thread_id]['setup'], guild_id)
+            for number, submission in sorted(submissions.items()):
+                self.archive.punchlines.add((thread_id, number), submission['punchline'], guild_id)
+                self.author_submissions.setdefault((guild_id, submission['user_id']), []).append((thread_id, number))
+
+        if self.active_competitions or self.scheduled_competitions:
+            logger.info(
+                "Restored %d active and %d scheduled competitions",
+                len(self.active_competitions), len(self.scheduled_competitions)
+            )
+
+    def _index_competition(self, thread_id, data):
+        guild_id = data.get('guild_id')
+        self.setup_references[(guild_id, data['setup_reference'])] = thread_id
+        self.guild_competitions.setdefault(guild_id, set()).add(thread_id)
+
+    def _persist_competition(self, thread_id):
+        data = self.active_competitions[thread_id]
+        # Live discord objects are not persisted; they are refetched when needed
+        self.store.put('competitions', thread_id, {k: v for k, v in data.items() if k != 'initial_message'})
+
+    def _store_submission(self, thread_id, number, submission):
+        self.submissions[thread_id][number] = submission
+        guild_id = self.active_competitions[thread_id].get('guild_id')
+        self.author_submissions.setdefault((guild_id, submission['user_id']), []).append((thread_id, number))
+        self.store.put('submissions', f"{thread_id}:{number}", submission)
+
+    def _store_punchline(self, thread_id, msg_data):
+        self.punchline_messages[thread_id].append(msg_data)
+        self.punchline_index[msg_data['message_id']] = (thread_id, msg_data['submission_number'])
+        self.store.put('punchlines', f"{thread_id}:{msg_data['message_id']}", msg_data)
+
+    def _forget_competition(self, thread_id):
+        """Drop every piece of state for a finished or cancelled competition"""
+        data = self.active_competitions.pop(thread_id, None)
+        if data:
+            reference = (data.get('guild_id'), data.get('setup_reference'))
+            if self.setup_references.get(reference) == thread_id:
+                del self.setup_references[reference]
+            threads = self.guild_competitions.get(data.get('guild_id'))
+            if threads is not None:
+                threads.discard(thread_id)
+                if not threads:
+                    del self.guild_competitions[data.get('guild_id')]
+        submissions = self.submissions.pop(thread_id, {})
+        guild_id = data.get('guild_id') if data else None
+        for number, submission in submissions.items():
+            self.store.delete('submissions', f"{thread_id}:{number}")
+            key = (guild_id, submission['user_id'])
+            remaining = [entry for entry in self.author_submissions.get(key, ()) if entry[0] != thread_id]
+            if remaining:
+                self.author_submissions[key] = remaining
+            else:
+                self.author_submissions.pop(key, None)
+        for msg_data in self.punchline_messages.pop(thread_id, []):
+            self.store.delete('punchlines', f"{thread_id}:{msg_data['message_id']}")
+            self.punchline_index.pop(msg_data['message_id'], None)
+        self.store.delete('competitions', thread_id)
+        self.vote_counts.pop(thread_id, None)
+        self.stale_tallies.discard(thread_id)
+        self.pipelines.pop(thread_id, None)
+        self.spool.release(thread_id)
+        self.limiter.forget(thread_id)
+        # Archived competitions stay in the duplicate indexes; abandoned ones leave them
+        if not self.archive.is_archived(thread_id):
+            self.archive.setups.discard(thread_id)
+            for number in submissions:
+                self.archive.punchlines.discard((thread_id, number))
+
+    async def cog_unload(self):
+        # Pending deadlines stay scheduled; a reloaded instance rebinds them to itself
+        self.bot.tree.remove_command(self.lookup_menu.name, type=self.lookup_menu.type)
+        hand_off(self, HANDOFF_STATE)
+        await self.stragglers.close()
 
     def get_setup_reference(self, setup):
         words = setup.strip().split(' ')
@@ -84,6 +265,7 @@ class JokeCompetition(commands.Cog):
         setup='The setup/question part of the joke',
         image='Optional image attachment for the joke'
     )
+    @deferred()
     async def startjoke(
         self, 
         interaction: discord.Interaction, 
@@ -92,101 +274,80 @@ class JokeCompetition(commands.Cog):
         setup: str,
         image: discord.Attachment = None
     ):
-        # Check permissions
+        # Runs as a background job once the interaction is deferred; the returned text becomes the response
         if not interaction.user.guild_permissions.manage_messages:
-            await interaction.response.send_message(
-                "❌ You need the Manage Messages permission to start competitions.", 
-                ephemeral=True
-            )
-            return
+            return "❌ You need the Manage Messages permission to start competitions."
 
         try:
             # Handle "now" as start time
             if start_time.lower() == "now":
                 start_time_dt = datetime.now(ZoneInfo("America/New_York"))
-                logger.info(f"Starting competition now: {start_time_dt.strftime('%Y-%m-%d %I:%M:%S %p %Z')}")
+                logger.info("Starting competition now: %s", start_time_dt, extra={'channel_id': interaction.channel_id})
             else:
                 start_time_dt = self.parse_time_of_day(start_time)
                 if start_time_dt <= datetime.now(ZoneInfo("America/New_York")):
                     start_time_dt += timedelta(days=1)
-                logger.info(f"Competition start time: {start_time_dt.strftime('%Y-%m-%d %I:%M:%S %p %Z')}")
+                logger.info("Competition start time: %s", start_time_dt, extra={'channel_id': interaction.channel_id})
 
             # Parse end time
             end_time_dt = self.parse_end_time(end_time, start_time_dt)
-            logger.info(f"Competition end time: {end_time_dt.strftime('%Y-%m-%d %I:%M:%S %p %Z')}")
-            
-            if end_time_dt <= start_time_dt:
-                await interaction.response.send_message(
-                    "❌ End time must be after start time!", 
-                    ephemeral=True
-                )
-                return
+            logger.info("Competition end time: %s", end_time_dt, extra={'channel_id': interaction.channel_id})
+        except ValueError as e:
+            return f"❌ {str(e)}"
 
-            # Handle image attachment
-            files = []
-            if image:
-                try:
-                    # Validate image type if needed
-                    if not image.content_type.startswith('image/'):
-                        await interaction.response.send_message(
-                            "❌ The attached file must be an image!", 
-                            ephemeral=True
-                        )
-                        return
-                    
-                    files = [await image.to_file()]
-                    logger.info(f"Image attachment processed: {image.filename}")
-                except Exception as e:
-                    logger.error(f"Error processing image attachment: {e}")
-                    await interaction.response.send_message(
-                        "❌ There was an error processing the image. Please try again.", 
-                        ephemeral=True
-                    )
-                    return
-
-            # Create setup reference
-            setup_reference = self.get_setup_reference(setup)
-            if setup_reference in self.setup_references:
-                await interaction.response.send_message(
-                    "❌ A joke competition with a similar setup is already active!", 
-                    ephemeral=True
-                )
-                return
+        if end_time_dt <= start_time_dt:
+            return "❌ End time must be after start time!"
 
-            # Acknowledge the command
-            await interaction.response.send_message(
-                "✅ Setting up the competition...", 
-                ephemeral=True
-            )
+        # Checked before the image is downloaded so a clash costs no transfer
+        setup_reference = self.get_setup_reference(setup)
+        if (interaction.guild_id, setup_reference) in self.setup_references:
+            return "❌ A joke competition with a similar setup is already active!"
+        # Also catches reworded setups that don't share the first five words
+        for thread_id, _ in self.archive.setups.query(setup, interaction.guild_id):
+            if thread_id in self.active_competitions:
+                return f"❌ A joke competition with a similar setup is already active in <#{thread_id}>!"
 
-            # For immediate start, create the competition now
-            if start_time.lower() == "now":
-                await self.create_competition(interaction, setup, start_time_dt, end_time_dt, files)
-            else:
-                # For scheduled start, store the data
-                self.active_competitions[f"scheduled_{interaction.channel_id}_{start_time_dt.timestamp()}"] = {
-                    'setup': setup,
-                    'start_time': start_time_dt,
-                    'end_time': end_time_dt,
-                    'channel_id': interaction.channel_id,
-                    'phase': 'scheduled',
-                    'setup_reference': setup_reference,
-                    'files': files
-                }
-                
-                await interaction.followup.send(
-                    f"✅ Competition scheduled successfully!\n"
-                    f"Setup: {setup}\n"
-                    f"Start: {start_time_dt.strftime('%I:%M %p')} ET\n"
-                    f"End: {end_time_dt.strftime('%I:%M %p')} ET",
-                    ephemeral=True
-                )
+        # Handle image attachment; it is spooled to disk until the setup is posted
+        comp_id = f"scheduled_{interaction.channel_id}_{start_time_dt.timestamp()}"
+        attachments = []
+        if image:
+            if not (image.content_type or '').startswith('image/'):
+                return "❌ The attached file must be an image!"
+            try:
+                attachments = [await self.spool.store(comp_id, image)]
+                logger.info("Image attachment processed: %s", image.filename, extra={'competition_id': comp_id})
+            except Exception as e:
+                logger.error("Error processing image attachment: %s", e, extra={'competition_id': comp_id})
+                return "❌ There was an error processing the image. Please try again."
 
-        except ValueError as e:
-            await interaction.response.send_message(
-                f"❌ {str(e)}", 
-                ephemeral=True
-            )
+        # For immediate start, create the competition now
+        if start_time.lower() == "now":
+            thread_id = await self.create_competition(interaction, setup, start_time_dt, end_time_dt, attachments)
+            return f"✅ Competition started in <#{thread_id}>!"
+
+        # For scheduled start, store the data and wake up exactly at start time
+        self.scheduled_competitions[comp_id] = {
+            'setup': setup,
+            'start_time': start_time_dt,
+            'end_time': end_time_dt,
+            'channel_id': interaction.channel_id,
+            'guild_id': interaction.guild_id,
+            'phase': 'scheduled',
+            'setup_reference': setup_reference,
+            'attachments': attachments
+        }
+        self.store.put('scheduled', comp_id, self.scheduled_competitions[comp_id])
+        self.scheduler.schedule(
+            ('competition_start', comp_id), start_time_dt,
+            self.start_scheduled_competition, comp_id
+        )
+
+        return (
+            f"✅ Competition scheduled successfully!\n"
+            f"Setup: {setup}\n"
+            f"Start: {start_time_dt.strftime('%I:%M %p')} ET\n"
+            f"End: {end_time_dt.strftime('%I:%M %p')} ET"
+        )
 
     @app_commands.command(name='lookup', description='Look up who submitted a specific punchline number')
     @app_commands.default_permissions(manage_messages=True)
@@ -217,14 +378,115 @@ class JokeCompetition(commands.Cog):
             )
             return
             
-        # Get submission data
+        await interaction.response.send_message(await self._describe_submission(thread_id, number), ephemeral=True)
+
+    async def lookup_message(self, interaction: discord.Interaction, message: discord.Message):
+        """Context menu on a reposted punchline: who wrote it"""
+        if not interaction.user.guild_permissions.manage_messages:
+            await interaction.response.send_message(
+                "❌ You need the Manage Messages permission to use this command.",
+                ephemeral=True
+            )
+            return
+
+        entry = self.punchline_index.get(message.id)
+        if entry is None:
+            await interaction.response.send_message(
+                "❌ That isn't a punchline in an active competition!",
+                ephemeral=True
+            )
+            return
+
+        await interaction.response.send_message(await self._describe_submission(*entry), ephemeral=True)
+
+    @app_commands.command(name='lookup_user', description='List the punchlines a member submitted to running competitions')
+    @app_commands.default_permissions(manage_messages=True)
+    @app_commands.describe(member='The member whose punchlines to list')
+    async def lookup_user(self, interaction: discord.Interaction, member: discord.Member):
+        if not interaction.user.guild_permissions.manage_messages:
+            await interaction.response.send_message(
+                "❌ You need the Manage Messages permission to use this command.",
+                ephemeral=True
+            )
+            return
+
+        entries = self.author_submissions.get((interaction.guild_id, member.id))
+        if not entries:
+            await interaction.response.send_message(
+                f"{member.mention} hasn't submitted to any running competition.",
+                ephemeral=True
+            )
+            return
+
+        lines = [f"{member.mention} submitted {len(entries)} punchlines:"]
+        for thread_id, number in entries:
+            punchline = self.submissions[thread_id][number]['punchline']
+            if len(punchline) > 100:
+                punchline = punchline[:99] + "…"
+            lines.append(f"• <#{thread_id}> #{number}: {punchline}")
+        content = "\n".join(lines)
+        if len(content) > 2000:
+            content = content[:1999] + "…"
+        await interaction.response.send_message(content, ephemeral=True)
+
+    async def _describe_submission(self, thread_id, number):
         submission = self.submissions[thread_id][number]
-        user = self.bot.get_user(submission['user_id'])
-        
-        await interaction.response.send_message(
-            f"Punchline #{number} was submitted by {user.mention}\nContent: {submission['punchline']}", 
-            ephemeral=True
+        mention = user_mention(submission['user_id'])
+        content = f"Punchline #{number} was submitted by {mention}\nContent: {submission['punchline']}"
+        if submission.get('duplicate_of'):
+            original_thread, original_number = submission['duplicate_of']
+            content += f"\n⚠️ Near-duplicate of punchline #{original_number} in <#{original_thread}>"
+        return content
+
+    @app_commands.command(name='stats', description='Show joke competition stats for a member')
+    @app_commands.describe(member='Whose stats to show (defaults to you)')
+    async def stats(self, interaction: discord.Interaction, member: Optional[discord.Member] = None):
+        # Answered from the archive's running totals, without reading history or calling Discord
+        user = member or interaction.user
+        stats = self.archive.user_stats(interaction.guild_id, user.id)
+        if stats is None:
+            await interaction.response.send_message(
+                f"{user.mention} hasn't entered any finished competitions yet.",
+                ephemeral=True
+            )
+            return
+
+        embed = discord.Embed(title=f"📊 Joke stats for {user.display_name}", color=discord.Color.gold())
+        embed.add_field(name="Wins", value=stats['wins'])
+        embed.add_field(name="Podiums", value=stats['podiums'])
+        embed.add_field(name="Competitions", value=stats['competitions'])
+        embed.add_field(name="Punchlines", value=stats['submissions'])
+        embed.add_field(name="Total ⭐", value=stats['stars'])
+        embed.add_field(name="Best punchline", value=f"{stats['best_stars']} ⭐")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name='leaderboard', description='Show the all-time joke competition leaderboard')
+    async def leaderboard(self, interaction: discord.Interaction):
+        guild_id = interaction.guild_id
+        board = self.archive.leaderboard(guild_id)
+        if not board:
+            await interaction.response.send_message("No competitions have finished here yet!", ephemeral=True)
+            return
+
+        lines = []
+        for place, (user_id, stats) in enumerate(board, 1):
+            medal = MEDALS[place - 1] if place <= len(MEDALS) else f"**{place}.**"
+            lines.append(f"{medal} <@{user_id}> - {stats['wins']} wins, {stats['stars']} ⭐")
+        embed = discord.Embed(
+            title="🏆 All-time leaderboard 🏆",
+            description="\n".join(lines),
+            color=discord.Color.gold()
         )
+        embed.set_footer(text=f"{self.archive.competition_count(guild_id)} competitions")
+
+        top = []
+        for entry in self.archive.top_punchlines(guild_id)[:5]:
+            url = f"https://discord.com/channels/{guild_id}/{entry['thread_id']}/{entry['message_id']}"
+            punchline = entry['punchline'] if len(entry['punchline']) <= 150 else entry['punchline'][:149] + "…"
+            top.append(f"[{entry['stars']} ⭐]({url}) {punchline} - <@{entry['user_id']}>")
+        if top:
+            embed.add_field(name="Best punchlines", value="\n".join(top)[:1024], inline=False)
+        await interaction.response.send_message(embed=embed)
 
     @commands.Cog.listener()
     async def on_message(self, message):
@@ -243,62 +505,249 @@ class JokeCompetition(commands.Cog):
             return
             
         if self.active_competitions[thread_id]['phase'] != 'submission':
-            await message.delete()
+            # The thread is locked by now; only what slipped through before that lands here
+            self.stragglers.queue(message)
             return
 
-        # Process the submission
-        submission_number = len(self.submissions[thread_id]) + 1
-        
-        # Image handling
-        files = []
-        if message.attachments:
-            for attachment in message.attachments:
-                if attachment.content_type.startswith('image/'):
-                    files.append(await attachment.to_file())
-                else:
-                    await message.author.send("Only image attachments are allowed.")
-                    return
-
-        # Message and image storage                
-        self.submissions[thread_id][submission_number] = {
-            'punchline': message.content,
-            'user_id': message.author.id,
-            'has_image': bool(files),
-            'files': files.copy() if files else None
-        }
+        # Checked in memory before any REST work, so a spammer can't crowd out other threads
+        scope, retry_after = self.limiter.check(thread_id, message.author.id)
+        if scope:
+            await self._throttle(message, scope, retry_after)
+            return
+
+        # Only images may be attached; reject before doing any REST work
+        for attachment in message.attachments:
+            if not (attachment.content_type or '').startswith('image/'):
+                await message.author.send("Only image attachments are allowed.")
+                return
+
+        # Exact copies of a punchline already in this thread are dropped. Near-duplicates are only
+        # flagged for moderators: one-word variants are what joke competitions are made of
+        sig, duplicate_of = self._find_duplicate(message, self.active_competitions[thread_id].get('guild_id'))
+        if duplicate_of and self._is_copy(message, duplicate_of):
+            await self._delete_original(message)
+            logger.info(
+                "Rejected duplicate of punchline #%s", duplicate_of[1],
+                extra={'category': 'duplicate', 'thread_id': thread_id, 'user_id': message.author.id}
+            )
+            try:
+                await message.author.send(
+                    f"Your punchline is the same as punchline #{duplicate_of[1]} in that competition, so it wasn't posted."
+                )
+            except discord.HTTPException:
+                pass
+            return
+
+        delete_task = None
 
-        # Delete the original message
+        async def prepare():
+            nonlocal delete_task
+            attachments = await self._spool_attachments(message)
+            # Only once the attachments are spooled (their URLs die with the message);
+            # the delete still overlaps with the wait for this submission's turn and the repost
+            delete_task = asyncio.create_task(self._delete_original(message))
+            return attachments
+
+        punchline_msg = await self.pipelines[thread_id].submit(
+            prepare,
+            lambda number, attachments: self._publish_submission(message, number, attachments, sig, duplicate_of)
+        )
+        if delete_task is None:
+            # Spooling failed: the original stays up so the punchline isn't lost
+            try:
+                await message.author.send(
+                    "Your image couldn't be saved, so your punchline wasn't posted. "
+                    "Your message is still in the thread: delete it and try again."
+                )
+            except discord.HTTPException:
+                pass
+            return
+        await delete_task
+        if punchline_msg is None:
+            return
+
+        await punchline_msg.add_reaction("⭐")
+        logger.info(
+            "Received submission for thread %s as message %s", thread_id, punchline_msg.id,
+            extra={'category': 'submission', 'thread_id': thread_id, 'user_id': message.author.id}
+        )
+
+    async def _throttle(self, message, scope, retry_after):
+        """Drop an over-limit submission; its author hears about it once per cooldown"""
+        thread_id = message.channel.id
+        self.metrics.inc('submissions_throttled_total', scope=scope)
+        # Throttled messages are removed in batches like stragglers, not one delete each
+        self.stragglers.queue(message)
+        if not self.limiter.should_notify(thread_id, message.author.id, max(retry_after, COOLDOWN_NOTICE_INTERVAL)):
+            return
+        self.metrics.inc('submission_cooldown_notices_total')
+        logger.info(
+            "Throttled submissions by %s (%s limit)", message.author.id, scope,
+            extra={'category': 'submission', 'thread_id': thread_id, 'user_id': message.author.id}
+        )
+        reason = "you're submitting" if scope == 'user' else "this competition is getting submissions"
+        try:
+            await message.author.send(
+                f"Slow down! {reason.capitalize()} faster than allowed, so some punchlines weren't posted. "
+                f"Try again in {max(1, round(retry_after))}s."
+            )
+        except discord.HTTPException:
+            pass
+
+    def _find_duplicate(self, message, guild_id):
+        """The submission's signature and the (thread ID, number) of its closest near-duplicate, if any"""
+        if len(normalize_text(message.content)) < MIN_DUPLICATE_CHARS:
+            return None, None
+        sig = signature(message.content)
+        matches = self.archive.punchlines.query(message.content, guild_id, sig)
+        # A copy within the thread matters more than an equally close archived one
+        for key, _ in matches:
+            if key[0] == message.channel.id:
+                return sig, key
+        return sig, matches[0][0] if matches else None
+
+    def _is_copy(self, message, duplicate_of):
+        """Whether the submission repeats a punchline of its own thread word for word, after normalization"""
+        thread_id, number = duplicate_of
+        original = self.submissions.get(thread_id, {}).get(number) if thread_id == message.channel.id else None
+        return original is not None and normalize_text(original['punchline']) == normalize_text(message.content)
+
+    async def _delete_original(self, message):
         try:
             await message.delete()
         except discord.Forbidden:
-            logger.warning("Bot doesn't have permission to delete messages")
+            logger.warning("Bot doesn't have permission to delete messages", extra={'thread_id': message.channel.id})
+        except discord.NotFound:
             pass
 
+    async def _spool_attachments(self, message):
+        return list(await asyncio.gather(
+            *(self.spool.store(message.channel.id, attachment) for attachment in message.attachments)
+        ))
+
+    async def _publish_submission(self, message, submission_number, attachments, sig=None, duplicate_of=None):
+        """Store and repost a submission; called by the pipeline in number order"""
+        thread_id = message.channel.id
+        competition = self.active_competitions.get(thread_id)
+        if not competition or competition['phase'] != 'submission':
+            return None
+
+        # Message and image storage
+        submission = {
+            'punchline': message.content,
+            'user_id': message.author.id,
+            'has_image': bool(attachments),
+            'attachments': attachments
+        }
+        if duplicate_of:
+            submission['duplicate_of'] = list(duplicate_of)
+            logger.warning(
+                "Punchline #%s is a near-duplicate of punchline #%s in thread %s",
+                submission_number, duplicate_of[1], duplicate_of[0],
+                extra={'category': 'duplicate', 'thread_id': thread_id, 'user_id': message.author.id}
+            )
+        self._store_submission(thread_id, submission_number, submission)
+        if sig is not None:
+            self.archive.punchlines.add((thread_id, submission_number), message.content, competition.get('guild_id'), sig)
+
         # Post the anonymous submission
+        files = [await self.spool.file(ref) for ref in attachments]
         content = f"**Punchline #{submission_number}:**\n{message.content}"
         if files:
             punchline_msg = await message.channel.send(content=content, files=files)
         else:
             punchline_msg = await message.channel.send(content=content)
-        
-        self.punchline_messages[thread_id].append({
+
+        # The original message is deleted, and its attachment URLs with it; an evicted or
+        # restarted spool refetches from the repost instead
+        if punchline_msg.attachments:
+            for ref, attachment in zip(attachments, punchline_msg.attachments):
+                ref['url'] = attachment.url
+            self.store.put('submissions', f"{thread_id}:{submission_number}", submission)
+
+        self._store_punchline(thread_id, {
             'message_id': punchline_msg.id,
             'submission_number': submission_number,
             'punchline': message.content,
             'has_image': bool(files)
         })
-        await punchline_msg.add_reaction("⭐")
-        logger.info(f"Recieved submission from {message.author.name} for thread {thread_id}")
-        logger.info(f"Stored message ID {punchline_msg.id}")
+        # Register before reacting so the bot's own ⭐ is counted like reaction.count would
+        self.vote_counts[thread_id][punchline_msg.id] = 0
+        return punchline_msg
+
+    def _apply_vote(self, payload, delta):
+        """Adjust the live tally for a raw ⭐ reaction event"""
+        if str(payload.emoji) != "⭐":
+            return
+        tally = self.vote_counts.get(payload.channel_id)
+        if tally is None or payload.message_id not in tally:
+            return
+        tally[payload.message_id] = max(0, tally[payload.message_id] + delta)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload):
+        self._apply_vote(payload, 1)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_remove(self, payload):
+        self._apply_vote(payload, -1)
+
+    def _clear_votes(self, payload):
+        """A moderator removed every reaction (or every ⭐) from a punchline: nothing is left to count"""
+        tally = self.vote_counts.get(payload.channel_id)
+        if tally is not None and payload.message_id in tally:
+            tally[payload.message_id] = 0
 
-    async def create_competition(self, interaction, setup, start_time, end_time, files=None):
+    @commands.Cog.listener()
+    async def on_raw_reaction_clear(self, payload):
+        self._clear_votes(payload)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_clear_emoji(self, payload):
+        if str(payload.emoji) == "⭐":
+            self._clear_votes(payload)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # A fresh gateway session does not replay reactions we missed while
+        # disconnected, so recount from history before the next close
+        self.stale_tallies.update(self.vote_counts.keys())
+
+    @commands.Cog.listener()
+    async def on_shard_ready(self, shard_id):
+        # One shard re-identified: only its guilds can have missed reactions
+        for guild_id, threads in self.guild_competitions.items():
+            if self.partition.shard_of(guild_id) == shard_id:
+                self.stale_tallies.update(threads)
+
+    async def reconcile_votes(self, thread):
+        """Rebuild a thread's tally from one bulk history read"""
+        tally = self.vote_counts.setdefault(thread.id, {})
+        known = {msg_data['message_id'] for msg_data in self.punchline_messages.get(thread.id, [])}
+        counts = dict.fromkeys(known, 0)
+        async for msg in thread.history(limit=None):
+            if msg.id not in counts:
+                continue
+            for reaction in msg.reactions:
+                if str(reaction.emoji) == "⭐":
+                    counts[msg.id] = reaction.count
+        tally.clear()
+        tally.update(counts)
+        self.stale_tallies.discard(thread.id)
+        logger.info("Reconciled %d vote counts for thread %s", len(counts), thread.id, extra={'thread_id': thread.id})
+
+    async def create_competition(self, interaction, setup, start_time, end_time, attachments=None):
         """Create a new competition with the given parameters"""
         channel = interaction.channel
         
         # Send setup and image together
         setup_message = f"## **Setup:** {setup}"
-        if files:
+        if attachments:
+            files = [await self.spool.file(ref) for ref in attachments]
             message = await channel.send(content=setup_message, files=files)
+            # The setup image is never reposted, so it can leave the spool now
+            for ref in attachments:
+                self.spool.release(ref['group'])
         else:
             message = await channel.send(setup_message)
 
@@ -318,15 +767,21 @@ class JokeCompetition(commands.Cog):
             'end_time': end_time,
             'message_id': message.id,
             'channel_id': channel.id,
+            'guild_id': channel.guild.id,
             'phase': 'submission',
             'setup_message': setup,
             'setup_reference': setup_reference,
             'initial_message': message,
-            'has_image': bool(files)
+            'has_image': bool(attachments)
         }
         self.submissions[thread.id] = {}
         self.punchline_messages[thread.id] = []
-        self.setup_references[setup_reference] = thread.id
+        self.vote_counts[thread.id] = {}
+        self.pipelines[thread.id] = SubmissionPipeline(MAX_IN_FLIGHT_SUBMISSIONS)
+        self._index_competition(thread.id, self.active_competitions[thread.id])
+        self.archive.setups.add(thread.id, setup, channel.guild.id)
+        self._persist_competition(thread.id)
+        self.scheduler.schedule(('competition_end', thread.id), end_time, self.close_competition, thread.id)
         
         # Post submission instructions in thread
         await thread.send(
@@ -338,161 +793,242 @@ class JokeCompetition(commands.Cog):
         
         return thread.id
 
-    @tasks.loop(minutes=1)
-    async def check_competitions(self):
-        now = datetime.now(ZoneInfo("America/New_York"))
-        
-        # Check for scheduled competitions that need to start
-        scheduled_competitions = {k: v for k, v in self.active_competitions.items() 
-                                if isinstance(k, str) and k.startswith('scheduled_')}
-        
-        for comp_id, data in scheduled_competitions.items():
-            if now >= data['start_time']:
-                # Get the channel
-                channel = self.bot.get_channel(data['channel_id'])
-                if channel:
-                    # Create mock interaction for create_competition
-                    class MockInteraction:
-                        def __init__(self, channel):
-                            self.channel = channel
-                    
-                    mock_interaction = MockInteraction(channel)
-                    
-                    # Create the competition
-                    thread_id = await self.create_competition(
-                        mock_interaction,
-                        data['setup'],
-                        data['start_time'],
-                        data['end_time'],
-                        data['files']
-                    )
-                    logger.info(f"Started scheduled competition in thread {thread_id}")
-                
-                # Remove the scheduled competition data
-                del self.active_competitions[comp_id]
-        
-        # Check for active competitions that need to end
-        active_competitions = {k: v for k, v in self.active_competitions.items() 
-                             if isinstance(k, int)}
-        
-        for thread_id, data in active_competitions.items():
-            if data['phase'] == 'submission' and now >= data['end_time']:
-                await self.end_competition(thread_id)
+    async def start_scheduled_competition(self, comp_id):
+        """Scheduler callback: open a competition that was scheduled for later"""
+        await self.bot.wait_until_ready()
+        data = self.scheduled_competitions.pop(comp_id, None)
+        if data is None:
+            return
+        self.store.delete('scheduled', comp_id)
+
+        # Get the channel
+        channel = self.bot.get_channel(data['channel_id'])
+        if not channel:
+            logger.warning(
+                "Channel %s for scheduled competition not found", data['channel_id'], extra={'competition_id': comp_id}
+            )
+            return
+
+        # Create mock interaction for create_competition
+        class MockInteraction:
+            def __init__(self, channel):
+                self.channel = channel
+
+        mock_interaction = MockInteraction(channel)
+
+        # Create the competition
+        thread_id = await self.create_competition(
+            mock_interaction,
+            data['setup'],
+            data['start_time'],
+            data['end_time'],
+            data['attachments']
+        )
+        logger.info(
+            "Started scheduled competition in thread %s", thread_id,
+            extra={'competition_id': comp_id, 'thread_id': thread_id}
+        )
+
+    def cancel_competition(self, comp_id):
+        """Drop a scheduled or running competition without announcing results"""
+        if self.scheduled_competitions.pop(comp_id, None) is not None:
+            self.store.delete('scheduled', comp_id)
+            self.spool.release(comp_id)
+            return self.scheduler.cancel(('competition_start', comp_id))
+        if comp_id not in self.active_competitions:
+            return False
+        self._forget_competition(comp_id)
+        return self.scheduler.cancel(('competition_end', comp_id))
+
+    async def close_competition(self, thread_id):
+        """Scheduler callback: end one competition with bounded concurrency and its own error handling"""
+        queued_at = time.perf_counter()
+        async with self.close_slots:
+            started_at = time.perf_counter()
+            self.metrics.observe('close_slot_wait_seconds', started_at - queued_at)
+            try:
+                async with self.metrics.track('close_competition'):
+                    await self.end_competition(thread_id)
+            except Exception as e:
+                logger.exception("Error closing competition %s: %s", thread_id, e, extra={'thread_id': thread_id})
+                self._retry_close(thread_id)
+            finally:
+                finished_at = time.perf_counter()
+                logger.info(
+                    "Close of competition %s took %.2fs (waited %.2fs for a close slot)",
+                    thread_id, finished_at - started_at, started_at - queued_at, extra={'thread_id': thread_id}
+                )
+
+    def _retry_close(self, thread_id):
+        competition = self.active_competitions.get(thread_id)
+        if competition is None:
+            return
+        attempts = competition.get('close_attempts', 0) + 1
+        if attempts >= MAX_CLOSE_ATTEMPTS:
+            logger.error(
+                "Giving up on closing competition %s after %d attempts", thread_id, attempts, extra={'thread_id': thread_id}
+            )
+            self._forget_competition(thread_id)
+            return
+        # The phase stays 'closing', so the thread takes no submissions while the retry waits
+        competition['close_attempts'] = attempts
+        self._persist_competition(thread_id)
+        self.scheduler.schedule(
+            ('competition_end', thread_id), time.time() + CLOSE_RETRY_DELAY, self.close_competition, thread_id
+        )
 
     async def end_competition(self, thread_id):
+        await self.bot.wait_until_ready()
+        competition = self.active_competitions.get(thread_id)
+        if not competition or competition['phase'] not in ('submission', 'closing'):
+            return
+
         thread = self.bot.get_channel(thread_id)
         if not thread:
+            logger.warning("Competition thread %s not found", thread_id, extra={'thread_id': thread_id})
             return
 
         original_channel = self.bot.get_channel(self.active_competitions[thread_id]['channel_id'])
         if not original_channel:
             return
 
-        self.active_competitions[thread_id]['phase'] = 'voting'
+        # A retried close redoes only the steps a failed attempt didn't finish
+        competition['phase'] = 'closing'
+        steps = competition.setdefault('close_steps', [])
+        self._persist_competition(thread_id)
+        await self._lock_thread(thread)
 
         # Safely handle setup_reference cleanup
         setup_ref = self.active_competitions[thread_id].get('setup_reference')
-        if setup_ref and setup_ref in self.setup_references:
-            del self.setup_references[setup_ref]
+        guild_id = self.active_competitions[thread_id].get('guild_id')
+        if setup_ref and (guild_id, setup_ref) in self.setup_references:
+            del self.setup_references[(guild_id, setup_ref)]
 
-        await thread.send("🎉 **Voting has ended!** Tallying results...")
-        logger.info("Starting vote count...")
+        if 'announced' not in steps:
+            await thread.send("🎉 **Voting has ended!** Tallying results...")
+            self._finish_close_step(thread_id, 'announced')
+        logger.info("Starting vote count...", extra={'thread_id': thread_id})
 
         setup = self.active_competitions[thread_id]['setup_message']
-        medals = ["🥇", "🥈", "🥉"]
 
+        if thread_id in self.stale_tallies:
+            try:
+                await self.reconcile_votes(thread)
+            except discord.HTTPException as e:
+                logger.warning("Could not reconcile votes for thread %s: %s", thread_id, e, extra={'thread_id': thread_id})
+
+        tally = self.vote_counts.get(thread_id, {})
         vote_data = []
         for msg_data in self.punchline_messages[thread_id]:
-            try:
-                msg = await thread.fetch_message(msg_data['message_id'])
-                logger.info(f"Checking message: {msg.content}")
-                for reaction in msg.reactions:
-                    logger.info(f"Found reaction: {reaction.emoji} with {reaction.count} votes")
-                    if str(reaction.emoji) == "⭐":
-                        vote_data.append({
-                            'message': msg,
-                            'votes': reaction.count,
-                            'punchline': msg_data['punchline'],
-                            'submission_number': msg_data['submission_number']
-                        })
-                        logger.info(f"Added to vote data with {reaction.count} votes")
-            except discord.NotFound:
-                logger.warning(f"Message {msg_data['message_id']} not found")
+            if msg_data['message_id'] not in tally:
+                logger.warning(
+                    "Message %s has no vote count", msg_data['message_id'],
+                    extra={'category': 'tally', 'thread_id': thread_id}
+                )
                 continue
+            vote_data.append({
+                'message_id': msg_data['message_id'],
+                'votes': tally[msg_data['message_id']],
+                'punchline': msg_data['punchline'],
+                'submission_number': msg_data['submission_number']
+            })
 
-        logger.info(f"Total vote entries: {len(vote_data)}")
+        logger.info("Total vote entries: %d", len(vote_data), extra={'thread_id': thread_id})
         
         vote_data.sort(key=lambda x: x['votes'], reverse=True)
 
-        # Send initial announcements
-        await original_channel.send(f"**Setup:** {setup}")
-        await original_channel.send("## 🏆 **WINNERS** 🏆")
-
-        # Process winners
-        if vote_data:
-            logger.info("Processing winners...")
-            for i, entry in enumerate(vote_data[:3]):
-                if i < len(medals):
-                    submission_data = self.submissions[thread_id][entry['submission_number']]
-                    author = self.bot.get_user(submission_data['user_id'])
-                    
-                    winner_message = (
-                        f"### {medals[i]} **{entry['votes']} votes**\n"
-                        f"{submission_data['punchline']}\n"
-                        f"by {author.mention}"
-                    )
-
-                    # Send winner announcement and image if present
-                    if submission_data.get('has_image'):
-                        try:
-                            original_msg = await thread.fetch_message(entry['message'].id)
-                            if original_msg.attachments:
-                                new_files = [await attachment.to_file() for attachment in original_msg.attachments]
-                                await original_channel.send(files=new_files)
-                        except Exception as e:
-                            logger.error(f"Error sending winner image: {e}")
-                    
-                    # Send winner's text
-                    try:
-                        await original_channel.send(winner_message)
-                        logger.info(f"Added winner: {entry['votes']} votes")
-                    except Exception as e:
-                        logger.error(f"Error sending winner message: {e}")
-        else:
-            logger.info("No vote data found")
-            await original_channel.send("### No votes were cast in this competition!")
+        # Build the announcement once and post it as a single embed message where possible
+        winners = []
+        top = vote_data[:len(MEDALS)]
+        for entry in top:
+            submission_data = self.submissions[thread_id][entry['submission_number']]
+            winners.append({
+                'votes': entry['votes'],
+                'punchline': submission_data['punchline'],
+                'mention': user_mention(submission_data['user_id']),
+                'url': f"{thread.jump_url}/{entry['message_id']}",
+                'refs': submission_data.get('attachments') if submission_data.get('has_image') else None
+            })
+        if not winners:
+            logger.info("No vote data found", extra={'thread_id': thread_id})
 
-        # Send footer
-        footer_text = f"\nSee all submissions in the [joke thread]({thread.jump_url})\n\nThanks everyone for participating!"
-        await original_channel.send(footer_text)
-        
-        # Build winner text for thread
-        thread_winner_text = "## 🏆 **WINNERS** 🏆\n\n"
-        if vote_data:
-            for i, entry in enumerate(vote_data[:3]):
-                if i < len(medals):
-                    submission_data = self.submissions[thread_id][entry['submission_number']]
-                    author = self.bot.get_user(submission_data['user_id'])
-                    thread_winner_text += (
-                        f"### {medals[i]} **{entry['votes']} votes**\n"
-                        f"{submission_data['punchline']}\n"
-                        f"by {author.mention}\n\n"
-                    )
-        else:
-            thread_winner_text += "### No votes were cast in this competition!\n\n"
+        renderer = ResultsRenderer(setup, winners, thread.jump_url, original_channel.guild.filesize_limit)
+        # Pages an earlier attempt got out are kept and not sent again
+        posted = competition.setdefault('results_messages', [])
+        sent = await self._fetch_results(original_channel, posted)
+        if 'results' not in steps:
+            pages = await renderer.render(self.spool.file)
+            for page in pages[:len(posted)]:
+                for spooled in page['files']:
+                    spooled.close()
+            try:
+                for page in pages[len(posted):]:
+                    message = await original_channel.send(**page)
+                    sent.append(message)
+                    posted.append(message.id)
+            except discord.HTTPException as e:
+                # Only a complete post finishes the step; the close is retried for the rest
+                logger.error("Error sending results: %s", e, extra={'thread_id': thread_id})
+                raise
+            finally:
+                self._persist_competition(thread_id)
+            logger.info("Posted %d winners in %d messages", len(winners), len(sent), extra={'thread_id': thread_id})
+            self._finish_close_step(thread_id, 'results')
+
+        # The thread reuses the embeds (and uploaded images) from the channel post
+        if 'thread_results' not in steps:
+            for page in renderer.thread_pages(sent):
+                await thread.send(**page)
+            self._finish_close_step(thread_id, 'thread_results')
 
-        # Send thread message
-        await thread.send(f"{thread_winner_text}Thanks everyone for participating!")
+        await self._archive_competition(thread_id, vote_data)
 
         # Cleanup
-        logger.info(f"Competition ended for thread {thread_id}")
-        del self.active_competitions[thread_id]
-        del self.submissions[thread_id]
-        del self.punchline_messages[thread_id]
+        logger.info("Competition ended for thread %s", thread_id, extra={'thread_id': thread_id})
+        self._forget_competition(thread_id)
 
-    @check_competitions.before_loop
-    async def before_check_competitions(self):
-        await self.bot.wait_until_ready()
+    def _finish_close_step(self, thread_id, step):
+        self.active_competitions[thread_id]['close_steps'].append(step)
+        self._persist_competition(thread_id)
+
+    async def _fetch_results(self, channel, message_ids):
+        """The results a previous close attempt posted, for the thread copy to reuse"""
+        sent = []
+        for message_id in message_ids:
+            try:
+                sent.append(await channel.fetch_message(message_id))
+            except discord.NotFound:
+                # Deleted by a moderator since; the thread copy goes without it
+                continue
+        return sent
+
+    async def _lock_thread(self, thread):
+        """Stop new messages in a closing thread, so late posts don't each cost a delete"""
+        try:
+            await thread.edit(locked=True, reason="Joke competition closed")
+        except discord.HTTPException as e:
+            # Without Manage Threads the stragglers are still bulk-deleted
+            logger.warning("Could not lock thread %s: %s", thread.id, e, extra={'thread_id': thread.id})
+
+    async def _archive_competition(self, thread_id, vote_data):
+        """Keep a closed competition's ranked punchlines for /stats and /leaderboard"""
+        competition = self.active_competitions[thread_id]
+        entries = [
+            {
+                'submission_number': entry['submission_number'],
+                'message_id': entry['message_id'],
+                'user_id': self.submissions[thread_id][entry['submission_number']]['user_id'],
+                'punchline': entry['punchline'],
+                # The tally includes the bot's own ⭐; the archive counts only members' votes
+                'stars': max(0, entry['votes'] - 1),
+            }
+            for entry in vote_data
+        ]
+        try:
+            await self.archive.record(thread_id, competition.get('guild_id'), competition['setup'], entries)
+        except Exception as e:
+            # The results are already posted; a lost archive entry shouldn't make the close retry
+            logger.exception("Error archiving competition %s: %s", thread_id, e, extra={'thread_id': thread_id})
 
 async def setup(bot):
     await bot.add_cog(JokeCompetition(bot))
\ No newline at end of file
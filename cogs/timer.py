@@ -2,87 +2,147 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import logging
-import asyncio
-from typing import Dict, Tuple
-from datetime import datetime
+import time
+from typing import Dict, Optional, Tuple
+from utils.channels import DEFAULT_DISCUSSION_NAMES, ChannelIndex, normalize_channel_name
+from utils.handoff import hand_off, take_over
 
 logger = logging.getLogger('discord')
 
 class TimerCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.active_timers: Dict[int, Tuple[float, asyncio.Task, str]] = {}
+        # channel_id -> (end timestamp, name); deadlines are driven by the bot's scheduler
+        self.active_timers: Dict[int, Tuple[float, str]] = {}
+        # Text channels by name per guild, so finding the discussion channel doesn't walk them all
+        self.channels = ChannelIndex()
+        # guild_id -> channel names that count as its discussion channel, when not the defaults
+        self.discussion_names: Dict[int, Tuple[str, ...]] = {}
+        self.scheduler = bot.scheduler
+        self.store = bot.store
+        self.partition = bot.partition
         logger.info("TimerCog initialized")
 
+    async def cog_load(self):
+        """Take over running timers on reload, or re-arm those that were running before a restart"""
+        if take_over(self, ('active_timers', 'channels', 'discussion_names'), ('timer',)):
+            return
+        for key, data in (await self.store.load('discussion_channels')).items():
+            if self.partition.owns(int(key)):
+                self.discussion_names[int(key)] = tuple(data['names'])
+        for key, data in (await self.store.load('timers')).items():
+            # Timers in guilds served by another shard process are left to it
+            if not self.partition.owns(data.get('guild_id')):
+                continue
+            channel_id = int(key)
+            self.active_timers[channel_id] = (data['end_time'], data['name'])
+            self.scheduler.schedule(('timer', channel_id), data['end_time'], self.run_timer, channel_id, data['name'])
+        if self.active_timers:
+            logger.info("Restored %d timers", len(self.active_timers))
+
+    async def cog_unload(self):
+        # Pending timers stay scheduled; a reloaded instance rebinds them to itself
+        hand_off(self, ('active_timers', 'channels', 'discussion_names'))
+
     def get_time_remaining(self, channel_id: int) -> int:
         if channel_id in self.active_timers:
-            end_time, _, _ = self.active_timers[channel_id]
-            remaining = end_time - asyncio.get_event_loop().time()
+            end_time, _ = self.active_timers[channel_id]
+            remaining = end_time - time.time()
             return max(0, int(remaining / 60))
         return 0
 
-    def find_discussion_channel(self, guild: discord.Guild) -> discord.TextChannel:
+    def get_discussion_names(self, guild_id: int) -> Tuple[str, ...]:
+        return self.discussion_names.get(guild_id, DEFAULT_DISCUSSION_NAMES)
+
+    def find_discussion_channel(self, guild: discord.Guild) -> Optional[discord.TextChannel]:
         """Find the script-discussions channel in the guild."""
-        for channel in guild.text_channels:
-            if channel.name.lower() in ['script-discussions', 'script-discussion', 'scripts']:
-                return channel
-        return None
+        return self.channels.find(guild, self.get_discussion_names(guild.id))
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        if isinstance(channel, discord.TextChannel):
+            self.channels.add(channel)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        if isinstance(after, discord.TextChannel) and before.name != after.name:
+            self.channels.remove(before)
+            self.channels.add(after)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        if isinstance(channel, discord.TextChannel):
+            self.channels.remove(channel)
 
-    async def run_timer(self, channel_id: int, channel: discord.TextChannel, minutes: int, name: str):
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.channels.forget(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild):
+        # Channel events during the outage were never delivered; index the guild afresh
+        self.channels.forget(guild.id)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # A new session may have missed channel events in any guild
+        self.channels.clear()
+
+    async def run_timer(self, channel_id: int, name: str):
+        """Scheduler callback: announce the end of a timer and open the discussion thread"""
+        await self.bot.wait_until_ready()
         try:
-            await asyncio.sleep(minutes * 60)
-            try:
-                discussion_channel = self.find_discussion_channel(channel.guild)
-                if not discussion_channel:
-                    await channel.send(content="Time!", tts=True)
-                    await channel.send("Note: Couldn't find a #script-discussions channel to create the thread in. Please create one!")
-                    return
-
-                # Create message and thread in discussion channel
-                msg = await discussion_channel.send(f"Script reading session completed for {name}")
-                thread_name = f"{name}'s Script Discussion"
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                channel = await self.bot.fetch_channel(channel_id)
+
+            discussion_channel = self.find_discussion_channel(channel.guild)
+            if not discussion_channel:
+                await channel.send(content="Time!", tts=True)
+                await channel.send(
+                    f"Note: Couldn't find a #{self.get_discussion_names(channel.guild.id)[0]} channel "
+                    f"to create the thread in. Please create one!"
+                )
+                return
+
+            # Create message and thread in discussion channel
+            msg = await discussion_channel.send(f"Script reading session completed for {name}")
+            thread_name = f"{name}'s Script Discussion"
+            
+            if discussion_channel.permissions_for(channel.guild.me).create_public_threads:
+                thread = await msg.create_thread(
+                    name=thread_name,
+                    reason=f"Automatic thread for {name}'s script discussion"
+                )
+                original_channel_name = getattr(channel, 'name', 'voice channel')
+                await thread.send(
+                    f"This thread has been created for additional notes, joke pitches, or continued discussion "
+                    f"about {name}'s script from today's writer's room. Feel free to share your thoughts!"
+                )
                 
-                if discussion_channel.permissions_for(channel.guild.me).create_public_threads:
-                    thread = await msg.create_thread(
-                        name=thread_name,
-                        reason=f"Automatic thread for {name}'s script discussion"
-                    )
-                    original_channel_name = getattr(channel, 'name', 'voice channel')
-                    await thread.send(
-                        f"This thread has been created for additional notes, joke pitches, or continued discussion "
-                        f"about {name}'s script from today's writer's room. Feel free to share your thoughts!"
-                    )
-                    
-                    # Send time's up message with thread link
-                    await channel.send(content="Time", tts=True)
-                    await channel.send(
-                        f"💡 Continue the discussion in the new thread: {thread.jump_url}\n"
-                        f"Share any additional notes, joke pitches, and feedback there!"
-                    )
-                else:
-                    await channel.send(content="Time is up, great job!", tts=True)
-                    logger.warning(f"Missing thread creation permission in channel {discussion_channel.id}")
-                    await channel.send("Note: I couldn't create a discussion thread because I don't have the 'Create Public Threads' permission.")
-                    
-            except discord.Forbidden:
-                logger.error(f"Missing permissions in channel {channel_id}")
-            except discord.NotFound:
-                logger.error(f"Channel {channel_id} not found")
-            except Exception as e:
-                logger.error(f"Error in timer completion: {e}")
+                # Send time's up message with thread link
+                await channel.send(content="Time", tts=True)
+                await channel.send(
+                    f"💡 Continue the discussion in the new thread: {thread.jump_url}\n"
+                    f"Share any additional notes, joke pitches, and feedback there!"
+                )
+            else:
+                await channel.send(content="Time is up, great job!", tts=True)
+                logger.warning("Missing thread creation permission in channel %s", discussion_channel.id)
+                await channel.send("Note: I couldn't create a discussion thread because I don't have the 'Create Public Threads' permission.")
                 
-        except asyncio.CancelledError:
-            try:
-                await channel.send("Timer has been cancelled.")
-            except (discord.Forbidden, discord.NotFound):
-                logger.info(f"Timer cancelled in channel {channel_id} but couldn't send notification")
-            except Exception as e:
-                logger.error(f"Error sending timer cancellation message: {e}")
+        except discord.Forbidden:
+            logger.error("Missing permissions in channel %s", channel_id)
+        except discord.NotFound:
+            logger.error("Channel %s not found", channel_id)
+        except Exception as e:
+            logger.error("Error in timer completion: %s", e)
                 
         finally:
             if channel_id in self.active_timers:
                 del self.active_timers[channel_id]
-                logger.info(f"Timer cleaned up for channel {channel_id}")
+                self.store.delete('timers', channel_id)
+                logger.info("Timer cleaned up for channel %s", channel_id)
 
     @app_commands.command(
         name="timer", description="Start a timer for script reading")
@@ -98,7 +158,7 @@ class TimerCog(commands.Cog):
         discussion_channel = self.find_discussion_channel(interaction.guild)
         if not discussion_channel:
             await interaction.response.send_message(
-                "Please create a text channel named 'script-discussions' first!", 
+                f"Please create a text channel named '{self.get_discussion_names(interaction.guild_id)[0]}' first!", 
                 ephemeral=True
             )
             return
@@ -113,9 +173,9 @@ class TimerCog(commands.Cog):
         if not channel_perms.send_tts_messages:
             missing_perms.append("Send TTS Messages (in current channel)")
         if not discussion_perms.send_messages:
-            missing_perms.append("Send Messages (in #script-discussions)")
+            missing_perms.append(f"Send Messages (in #{discussion_channel.name})")
         if not discussion_perms.create_public_threads:
-            missing_perms.append("Create Public Threads (in #script-discussions)")
+            missing_perms.append(f"Create Public Threads (in #{discussion_channel.name})")
             
         if missing_perms:
             await interaction.response.send_message(
@@ -141,9 +201,10 @@ class TimerCog(commands.Cog):
             await interaction.response.send_message("Please set a time of 60 minutes or less!", ephemeral=True)
             return
             
-        end_time = asyncio.get_event_loop().time() + (minutes * 60)
-        timer_task = asyncio.create_task(self.run_timer(channel_id, interaction.channel, minutes, name))
-        self.active_timers[channel_id] = (end_time, timer_task, name)
+        end_time = time.time() + (minutes * 60)
+        self.active_timers[channel_id] = (end_time, name)
+        self.store.put('timers', channel_id, {'end_time': end_time, 'name': name, 'guild_id': interaction.guild_id})
+        self.scheduler.schedule(('timer', channel_id), end_time, self.run_timer, channel_id, name)
             
         await interaction.response.send_message(f"Timer started for {minutes} minutes to read {name}'s script!")
 
@@ -158,10 +219,18 @@ class TimerCog(commands.Cog):
             await interaction.response.send_message("There's no active timer in this channel!", ephemeral=True)
             return
             
-        _, task, name = self.active_timers[channel_id]
-        task.cancel()
+        _, name = self.active_timers.pop(channel_id)
+        self.scheduler.cancel(('timer', channel_id))
+        self.store.delete('timers', channel_id)
+        logger.info("Timer cleaned up for channel %s", channel_id)
         
         await interaction.response.send_message(f"Timer for {name}'s script has been cancelled!")
+        try:
+            await interaction.channel.send("Timer has been cancelled.")
+        except (discord.Forbidden, discord.NotFound):
+            logger.info("Timer cancelled in channel %s but couldn't send notification", channel_id)
+        except Exception as e:
+            logger.error("Error sending timer cancellation message: %s", e)
 
     @app_commands.command(
         name="check_timer",
@@ -175,8 +244,53 @@ class TimerCog(commands.Cog):
             return
             
         remaining = self.get_time_remaining(channel_id)
-        _, _, name = self.active_timers[channel_id]
+        _, name = self.active_timers[channel_id]
         await interaction.response.send_message(f"There are {remaining} minutes remaining on the timer for {name}'s script.")
 
+    @app_commands.command(
+        name="discussion_channel",
+        description="Set which channel names timers open their discussion thread in"
+    )
+    @app_commands.default_permissions(manage_guild=True)
+    @app_commands.describe(
+        names="Comma-separated channel names, in order of preference; \"default\" restores the defaults"
+    )
+    async def discussion_channel(self, interaction: discord.Interaction, names: Optional[str] = None):
+        guild_id = interaction.guild_id
+
+        if names is None:
+            current = ', '.join(f"#{name}" for name in self.get_discussion_names(guild_id))
+            await interaction.response.send_message(f"Timer discussions go to the first of: {current}", ephemeral=True)
+            return
+
+        if not interaction.user.guild_permissions.manage_guild:
+            await interaction.response.send_message(
+                "You need the Manage Server permission to change the discussion channel.",
+                ephemeral=True
+            )
+            return
+
+        if normalize_channel_name(names) == 'default':
+            self.discussion_names.pop(guild_id, None)
+            self.store.delete('discussion_channels', guild_id)
+            chosen = DEFAULT_DISCUSSION_NAMES
+        else:
+            chosen = tuple(dict.fromkeys(
+                name for name in (normalize_channel_name(part) for part in names.split(',')) if name
+            ))
+            if not chosen:
+                await interaction.response.send_message("Please give at least one channel name!", ephemeral=True)
+                return
+            self.discussion_names[guild_id] = chosen
+            self.store.put('discussion_channels', guild_id, {'names': list(chosen)})
+        logger.info("Discussion channel names for guild %s set to %s", guild_id, chosen)
+
+        found = self.find_discussion_channel(interaction.guild)
+        note = f"Currently that's {found.mention}." if found else "No channel with those names exists yet."
+        await interaction.response.send_message(
+            f"Timer discussions will go to the first of: {', '.join(f'#{name}' for name in chosen)}. {note}",
+            ephemeral=True
+        )
+
 async def setup(bot):
     await bot.add_cog(TimerCog(bot))
\ No newline at end of file
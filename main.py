@@ -1,64 +1,285 @@
+import aiohttp
 import discord
 from discord.ext import commands
+from discord.gateway import DiscordWebSocket, ReconnectWebSocket
 import asyncio
 import logging
-from cogs.joke_competition import JokeCompetition
-from cogs.timer import TimerCog
-from cogs.basic import BasicCog
+from utils.scheduler import DeadlineScheduler
+from utils.store import StateStore
+from utils.archive import CompetitionArchive
+from utils.spool import AttachmentSpool
+from utils.recorder import GatewayRecorder
+from utils.metrics import (
+    Metrics, MetricsCommandTree, MetricsServer, current_operation, describe_bot_metrics,
+    instrument_http, instrument_rate_limits
+)
+from utils.watchdog import StallDetector
+from utils.intents import client_options
+from utils.reconnect import FATAL_CLOSE_CODES, ReconnectController, disconnect_reason
+from utils.sharding import ShardPartition, parse_shard_ids
+from utils.interactions import JobQueue
+from utils.logs import LogPipeline
+from utils.ratelimit import SubmissionLimiter, parse_rate_limits
+from utils.profiling import MAX_PROFILE_SECONDS, profile_busy, profile_cpu, profile_memory
+import hashlib
+from typing import Optional
+import io
+import json
+import time
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Logging goes through a queue so formatting and I/O happen off the event loop.
+# LOG_FORMAT=text for human-readable lines instead of JSON; LOG_RATE_LIMITS
+# (e.g. "submission=30/60,tally=10/60") overrides the per-category limits
+rate_limits = os.getenv('LOG_RATE_LIMITS')
+log_pipeline = LogPipeline(
+    level=getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper()),
+    fmt=os.getenv('LOG_FORMAT', 'json'),
+    rate_limits=parse_rate_limits(rate_limits) if rate_limits else None
+)
+log_pipeline.install()
 logger = logging.getLogger('discord')
 
-class ResilientBot(commands.Bot):
+# Cogs are loaded as extensions so they can be reloaded in place with !reload
+EXTENSIONS = ('cogs.joke_competition', 'cogs.timer', 'cogs.basic')
+
+# SHARD_COUNT runs the bot as an AutoShardedBot; SHARD_IDS (e.g. "0-3") limits
+# this process to a range of those shards so ranges can run in separate processes
+shard_count = os.getenv('SHARD_COUNT')
+shard_ids = os.getenv('SHARD_IDS')
+partition = ShardPartition(
+    int(shard_count) if shard_count else None,
+    parse_shard_ids(shard_ids) if shard_ids else None
+)
+BotBase = commands.AutoShardedBot if partition.sharded else commands.Bot
+
+class ResilientBot(BotBase):
+    def __init__(self, *args, partition: Optional[ShardPartition] = None, **kwargs):
+        partition = partition or ShardPartition()
+        super().__init__(*args, **partition.client_options(), **kwargs)
+        # Guilds whose state this process holds; cogs only restore and scan these
+        self.partition = partition
+        # Shared deadline scheduler for competition start/end and script timers
+        self.scheduler = DeadlineScheduler()
+        # Competition and timer state survives restarts unless PERSIST_STATE=0
+        persist = os.getenv('PERSIST_STATE', '1') != '0'
+        self.store = StateStore(os.getenv('STATE_DB', 'sketchy_state.db') if persist else None)
+        # Closed competitions and their leaderboards; kept in memory only without persistence
+        self.archive = CompetitionArchive(
+            os.getenv('ARCHIVE_DB', 'sketchy_archive.db') if persist else None, partition
+        )
+        # Competition images are streamed to disk instead of held in memory; a SPOOL_DIR is
+        # emptied at startup, so shard processes each need their own
+        self.spool = AttachmentSpool(
+            os.getenv('SPOOL_DIR'),
+            max_bytes=int(os.getenv('SPOOL_MAX_MB', '256')) * 1024 * 1024
+        )
+        # RECORD_EVENTS=<path> captures handled gateway events for offline replay
+        record_path = os.getenv('RECORD_EVENTS')
+        self.recorder = GatewayRecorder(record_path) if record_path else None
+        # SUBMISSION_LIMITS ("user=5/30,thread=60/60": bursts and refills per window in seconds)
+        # caps submissions per author per thread and per thread; empty turns the limits off
+        self.submission_limiter = SubmissionLimiter(
+            parse_rate_limits(os.getenv('SUBMISSION_LIMITS', 'user=5/30,thread=60/60'))
+        )
+        # Command/listener latency, REST and rate-limit metrics; METRICS_PORT=0 turns the endpoint off
+        self.metrics = Metrics()
+        describe_bot_metrics(self.metrics)
+        instrument_http(self.metrics, self.http)
+        instrument_rate_limits(self.metrics)
+        metrics_port = int(os.getenv('METRICS_PORT', '9108'))
+        self.metrics_server = MetricsServer(
+            self.metrics, self, os.getenv('METRICS_HOST', '127.0.0.1'), metrics_port
+        ) if metrics_port else None
+        # Slow halves of deferred app commands, at most MAX_INTERACTION_JOBS running at once
+        self.jobs = JobQueue(self.metrics, limit=int(os.getenv('MAX_INTERACTION_JOBS', '8')))
+        # Live cog state left by an unloading cog for its reloaded replacement
+        self.cog_handoff = {}
+        # Set when the bot starts; on_ready logs the time to ready from it
+        self.started_at = None
+        # Reconnect backoff (RECONNECT_BASE/RECONNECT_CAP seconds) and time-to-recover per disconnect reason
+        self.reconnects = ReconnectController(
+            self.metrics,
+            base=float(os.getenv('RECONNECT_BASE', '1')),
+            cap=float(os.getenv('RECONNECT_CAP', '300'))
+        )
+        # Reports what was running whenever the event loop is blocked for STALL_THRESHOLD_MS or more
+        self.stall_detector = StallDetector(
+            threshold=int(os.getenv('STALL_THRESHOLD_MS', '250')) / 1000, metrics=self.metrics
+        )
+
     async def setup_hook(self):
-        # Add the cogs 
-        await self.add_cog(JokeCompetition(self))
-        await self.add_cog(TimerCog(self))
-        await self.add_cog(BasicCog(self))
+        logger.info("Starting with %s", self.partition)
+        # Open the store first so cogs can rebuild their state in cog_load
+        await self.store.open()
+        await self.archive.open()
+        if self.recorder:
+            self.recorder.install(self)
+        self.stall_detector.start()
+        if self.metrics_server:
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                logger.error("Could not start metrics endpoint: %s", e)
 
-        # Force sync the commands with Discord
-        logger.info("Syncing commands with Discord...")
+        # Load the cogs
+        for extension in EXTENSIONS:
+            await self.load_extension(extension)
+
+        # Sync the commands with Discord only if they changed since the last sync
         try:
-            synced = await self.tree.sync()
-            logger.info(f"Synced {len(synced)} commands")
+            await self.sync_commands()
         except Exception as e:
-            logger.error(f"Error syncing commands: {e}")
-        
-    async def start(self, *args, **kwargs):
+            logger.error("Error syncing commands: %s", e)
+
+    def command_tree_fingerprint(self) -> str:
+        """Hash of the global command tree exactly as it would be sent to Discord"""
+        payload = sorted(
+            (command.to_dict(self.tree) for command in self.tree.get_commands()),
+            key=lambda data: (data.get('type', 1), data['name'])
+        )
+        encoded = json.dumps([str(self.application_id), payload], sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    async def sync_commands(self, force: bool = False):
+        """Sync the global command tree unless its fingerprint matches the last successful sync.
+
+        Returns the synced commands, or None if the sync was skipped.
+        """
+        fingerprint = self.command_tree_fingerprint()
+        stored = (await self.store.load('meta')).get('command_tree_fingerprint')
+        if not force and stored == fingerprint:
+            logger.info("Command tree unchanged (%s), skipping sync", fingerprint[:12])
+            return None
+        logger.info("Syncing commands with Discord...")
+        start = time.perf_counter()
+        synced = await self.tree.sync()
+        self.store.put('meta', 'command_tree_fingerprint', fingerprint)
+        logger.info("Synced %d commands in %.2fs", len(synced), time.perf_counter() - start)
+        return synced
+
+    async def _run_event(self, coro, event_name, *args, **kwargs):
+        # Time every listener and attribute its REST calls to the event
+        current_operation.set(event_name)
+        start = time.perf_counter()
+        try:
+            await super()._run_event(coro, event_name, *args, **kwargs)
+        finally:
+            self.metrics.observe('event_seconds', time.perf_counter() - start, event=event_name)
+
+    async def close(self):
+        self.scheduler.close()
+        self.stall_detector.close()
+        await self.jobs.close()
+        if self.metrics_server:
+            await self.metrics_server.close()
+        await super().close()
+        await self.store.close()
+        await self.archive.close()
+        await self.spool.close()
+        if self.recorder:
+            self.recorder.close()
+
+    async def start(self, token, *, reconnect=True):
+        """Log in once, then stay connected; cog state lives on across every reconnect"""
+        self.started_at = time.perf_counter()
         while True:
             try:
-                await super().start(*args, **kwargs)
-            except discord.ConnectionClosed:
-                logger.warning("Discord connection closed. Reconnecting...")
-                await asyncio.sleep(5)
-            except discord.GatewayNotFound:
-                logger.warning("Discord gateway not found. Reconnecting...")
-                await asyncio.sleep(5)
-            except discord.HTTPException as e:
-                logger.warning(f"HTTP Exception: {e}. Reconnecting...")
-                await asyncio.sleep(5)
-            except Exception as e:
-                logger.error(f"Unexpected error: {e}. Reconnecting...")
-                await asyncio.sleep(5)
-
-# Set up intents
-intents = discord.Intents.all()
+                await self.login(token)
+                break
+            except discord.LoginFailure:
+                raise
+            except (discord.HTTPException, aiohttp.ClientError, OSError) as e:
+                reason = disconnect_reason(e)
+                self.reconnects.disconnected(reason)
+                delay = self.reconnects.delay()
+                logger.warning("Login failed (%s: %s). Retrying in %.1fs", reason, e, delay)
+                await asyncio.sleep(delay)
+        await self.connect(reconnect=reconnect)
+
+    async def connect(self, *, reconnect=True):
+        """Gateway loop with jittered, capped backoff that always tries to resume the session.
+
+        Mirrors discord.py's own loop, but reports each outage to the reconnect
+        controller. Sharded mode keeps discord.py's per-shard handling; its
+        outages are tracked from the shard events.
+        """
+        if self.partition.sharded or not reconnect:
+            return await super().connect(reconnect=reconnect)
+
+        ws_params = {'initial': True, 'shard_id': self.shard_id}
+        while not self.is_closed():
+            try:
+                self.ws = await asyncio.wait_for(DiscordWebSocket.from_client(self, **ws_params), timeout=60.0)
+                ws_params['initial'] = False
+                while True:
+                    await self.ws.poll_event()
+            except ReconnectWebSocket as e:
+                # Discord asked for a reconnect, or invalidated the session
+                self.dispatch('disconnect')
+                self.reconnects.disconnected('ReconnectRequested')
+                ws_params.update(sequence=self.ws.sequence, resume=e.resume, session=self.ws.session_id)
+                if e.resume:
+                    ws_params['gateway'] = self.ws.gateway
+            except (
+                OSError,
+                discord.HTTPException,
+                discord.GatewayNotFound,
+                discord.ConnectionClosed,
+                aiohttp.ClientError,
+                asyncio.TimeoutError,
+            ) as e:
+                self.dispatch('disconnect')
+                if self.is_closed():
+                    return
+                if isinstance(e, discord.ConnectionClosed) and e.code in FATAL_CLOSE_CODES:
+                    if e.code == 4014:
+                        raise discord.PrivilegedIntentsRequired(e.shard_id) from None
+                    await self.close()
+                    raise
+
+                reason = disconnect_reason(e)
+                self.reconnects.disconnected(reason)
+                delay = self.reconnects.delay()
+                logger.warning("Gateway connection lost (%s: %s). Reconnecting in %.1fs", reason, e, delay)
+                await asyncio.sleep(delay)
+                # Always try to resume; the gateway invalidates the session if it can't be resumed
+                if self.ws is not None:
+                    ws_params.update(
+                        sequence=self.ws.sequence,
+                        gateway=self.ws.gateway,
+                        initial=False,
+                        resume=self.ws.session_id is not None,
+                        session=self.ws.session_id,
+                    )
+
+# Intents and caching: CACHE_PROFILE=full restores Intents.all() with every member cached
+cache_profile = os.getenv('CACHE_PROFILE', 'lean')
 
 # Initialize bot with application ID
 bot = ResilientBot(
     command_prefix='!',  # Keeping prefix for backwards compatibility
-    intents=intents,
+    tree_cls=MetricsCommandTree,
+    partition=partition,
+    **client_options(cache_profile),
 )
+log_pipeline.instrument(bot.metrics)
 
 @bot.event
 async def on_ready():
-    logger.info(f'{bot.user} has connected to Discord!')
+    bot.reconnects.recovered('identify')
+    if bot.started_at is not None:
+        # Only the first ready after a start; later ones are gateway resumes/re-identifies
+        time_to_ready = time.perf_counter() - bot.started_at
+        bot.started_at = None
+        bot.metrics.set('time_to_ready_seconds', time_to_ready)
+        logger.info('%s has connected to Discord! Ready %.2fs after start', bot.user, time_to_ready)
+    else:
+        logger.info('%s has connected to Discord!', bot.user)
     # Set up a custom status showing slash command usage
     activity = discord.Activity(
         type=discord.ActivityType.listening,
@@ -71,27 +292,112 @@ async def on_ready():
 async def sync(ctx):
     logger.info("Manual sync initiated...")
     try:
-        synced = await bot.tree.sync()
+        synced = await bot.sync_commands(force=True)
         await ctx.send(f"Synced {len(synced)} commands")
-        logger.info(f"Manually synced {len(synced)} commands")
+        logger.info("Manually synced %d commands", len(synced))
         # Print out all registered commands
         commands = [command.name for command in bot.tree.get_commands()]
-        logger.info(f"Currently registered commands: {commands}")
+        logger.info("Currently registered commands: %s", commands)
     except Exception as e:
-        logger.error(f"Error syncing commands: {e}")
+        logger.error("Error syncing commands: %s", e)
         await ctx.send(f"Error syncing commands: {e}")
 
+@bot.command()
+@commands.is_owner()
+async def reload(ctx, *extensions: str):
+    """Reload cogs in place, keeping their live state: `!reload` or `!reload timer joke_competition`"""
+    names = [name if name.startswith('cogs.') else f"cogs.{name}" for name in extensions] or list(EXTENSIONS)
+    start = time.perf_counter()
+    try:
+        for name in names:
+            await bot.reload_extension(name)
+    except commands.ExtensionError as e:
+        logger.error("Error reloading %s: %s", name, e)
+        await ctx.send(f"Error reloading {name}: {e}")
+        return
+    elapsed = (time.perf_counter() - start) * 1000
+    logger.info("Reloaded %s in %.0fms", ', '.join(names), elapsed)
+    try:
+        synced = await bot.sync_commands()
+    except Exception as e:
+        logger.error("Error syncing commands after reload: %s", e)
+        synced = None
+    note = f", synced {len(synced)} changed commands" if synced is not None else ""
+    await ctx.send(f"Reloaded {', '.join(names)} in {elapsed:.0f}ms{note}")
+
+@bot.command()
+@commands.is_owner()
+async def stalls(ctx, count: int = 5):
+    """Show the worst event-loop stalls of the last hour, with full stacks attached"""
+    detector = bot.stall_detector
+    worst = detector.worst(count)
+    if not worst:
+        await ctx.send(f"No event-loop stalls over {detector.threshold * 1000:.0f}ms in the last hour")
+        return
+    lines = [f"Worst event-loop stalls in the last hour (threshold {detector.threshold * 1000:.0f}ms):"]
+    stacks = []
+    for i, stall in enumerate(worst, 1):
+        at = time.strftime('%H:%M:%S', time.localtime(stall['at']))
+        summary = (
+            f"{i}. {stall['duration'] * 1000:.0f}ms at {at} in {stall['coroutine'] or 'a callback'} "
+            f"({stall['task'] or 'no task'}) - {stall['location'] or 'stack not captured'}"
+        )
+        lines.append(summary)
+        stacks.append(f"{summary}\n{stall['stack'] or '(stack not captured)'}\n")
+    report = discord.File(io.BytesIO("\n".join(stacks).encode()), filename='stalls.txt')
+    await ctx.send("\n".join(lines)[:2000], file=report)
+
+@bot.command()
+@commands.is_owner()
+async def profile(ctx, kind: str = 'cpu', seconds: int = 30):
+    """Profile the live bot for N seconds: `!profile cpu 30` or `!profile memory 60`"""
+    if kind not in ('cpu', 'memory'):
+        await ctx.send("Usage: `!profile cpu|memory [seconds]`")
+        return
+    if profile_busy():
+        await ctx.send("A profile is already running, try again when it finishes")
+        return
+    seconds = max(1, min(seconds, MAX_PROFILE_SECONDS))
+    await ctx.send(f"Profiling {kind} for {seconds}s...")
+    logger.info("Owner %s profile started for %ss", kind, seconds)
+    try:
+        files = await (profile_cpu(seconds) if kind == 'cpu' else profile_memory(seconds))
+        await ctx.send(f"{kind.upper()} profile over {seconds}s:", files=files)
+    except Exception as e:
+        logger.error("Error profiling %s: %s", kind, e)
+        await ctx.send(f"Error profiling {kind}: {e}")
+
 @bot.event
 async def on_disconnect():
     logger.warning('Bot disconnected from Discord')
 
+@bot.event
+async def on_resumed():
+    bot.reconnects.recovered('resume')
+
+@bot.event
+async def on_shard_disconnect(shard_id):
+    # discord.py handles shard reconnects itself and doesn't report why
+    bot.reconnects.disconnected('unknown', shard_id)
+
+@bot.event
+async def on_shard_resumed(shard_id):
+    bot.reconnects.recovered('resume', shard_id)
+
+@bot.event
+async def on_shard_ready(shard_id):
+    bot.reconnects.recovered('identify', shard_id)
+
 @bot.event
 async def on_connect():
     logger.info('Bot reconnected to Discord')
 
 try:
-    bot.run(os.getenv('DISCORD_TOKEN'))
+    # Logging is already set up; don't let discord.py add its own handler
+    bot.run(os.getenv('DISCORD_TOKEN'), log_handler=None)
 except KeyboardInterrupt:
     logger.info("Bot shutdown by user")
 except Exception as e:
-    logger.error(f"Fatal error: {e}")
\ No newline at end of file
+    logger.error("Fatal error: %s", e)
+finally:
+    log_pipeline.close()
\ No newline at end of file
@@ -0,0 +1,314 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from utils.similarity import SimilarityIndex
+
+logger = logging.getLogger('discord')
+
+# Users kept on each guild's precomputed leaderboard
+LEADERBOARD_SIZE = 10
+# All-time best punchlines kept per guild
+TOP_PUNCHLINES = 10
+
+STAT_FIELDS = ('competitions', 'submissions', 'wins', 'podiums', 'stars', 'best_stars')
+
+
+def _rank(stats: Dict) -> Tuple[int, int, int]:
+    return stats['wins'], stats['stars'], stats['podiums']
+
+
+class CompetitionArchive:
+    """Closed competitions and the aggregates the stats commands read.
+
+    Every punchline of a closed competition is written to SQLite, indexed by
+    guild, user and close time. In the same transaction the per-user totals
+    (wins, podiums, stars, ...) are bumped, so they never need recomputing
+    from history. Those totals, each guild's leaderboard and its all-time top
+    punchlines are also held in memory and updated on every ``record``;
+    ``user_stats``, ``leaderboard`` and ``top_punchlines`` are dict lookups.
+
+    ``punchlines`` and ``setups`` are near-duplicate indexes over everything
+    archived; the cog adds running competitions to them as well. Punchline
+    signatures are stored with the entries so reopening doesn't rehash them.
+
+    An archive created with ``path=None`` keeps only the in-memory aggregates.
+    """
+
+    def __init__(self, path: Optional[str], partition=None):
+        self.path = path
+        self.partition = partition
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # (guild_id, user_id) -> totals
+        self._users: Dict[Tuple[int, int], Dict[str, int]] = {}
+        # guild_id -> user IDs ordered by wins, then stars
+        self._leaderboards: Dict[int, List[int]] = {}
+        # guild_id -> best punchlines, most stars first
+        self._top: Dict[int, List[Dict]] = {}
+        # guild_id -> number of archived competitions
+        self._competitions: Dict[int, int] = {}
+        self._recorded = set()
+        # Keyed by (thread_id, submission_number) and thread_id, namespaced by guild
+        self.punchlines = SimilarityIndex()
+        self.setups = SimilarityIndex()
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    async def open(self) -> None:
+        if not self.enabled or self._conn is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='archive')
+        users, top, competitions = await self._run(self._connect_and_load)
+        for (guild_id, user_id), stats in users.items():
+            if self._owns(guild_id):
+                self._users[(guild_id, user_id)] = stats
+        for guild_id, count in competitions.items():
+            if self._owns(guild_id):
+                self._competitions[guild_id] = count
+                self._top[guild_id] = top.get(guild_id, [])
+        by_guild: Dict[int, List[int]] = {}
+        for guild_id, user_id in self._users:
+            by_guild.setdefault(guild_id, []).append(user_id)
+        for guild_id, user_ids in by_guild.items():
+            self._leaderboards[guild_id] = self._ranked(guild_id, user_ids)
+        logger.info(
+            f"Competition archive opened at {self.path} ({sum(self._competitions.values())} competitions, "
+            f"{len(self.punchlines)} punchlines)"
+        )
+
+    def _owns(self, guild_id: int) -> bool:
+        return self.partition is None or self.partition.owns(guild_id)
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _connect_and_load(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(
+            "CREATE TABLE IF NOT EXISTS competitions ("
+            " thread_id INTEGER PRIMARY KEY,"
+            " guild_id INTEGER NOT NULL,"
+            " setup TEXT NOT NULL,"
+            " closed_at REAL NOT NULL,"
+            " entries INTEGER NOT NULL"
+            ");"
+            "CREATE INDEX IF NOT EXISTS competitions_by_guild ON competitions (guild_id, closed_at);"
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " thread_id INTEGER NOT NULL,"
+            " submission_number INTEGER NOT NULL,"
+            " message_id INTEGER NOT NULL,"
+            " guild_id INTEGER NOT NULL,"
+            " user_id INTEGER NOT NULL,"
+            " punchline TEXT NOT NULL,"
+            " stars INTEGER NOT NULL,"
+            " place INTEGER NOT NULL,"
+            " closed_at REAL NOT NULL,"
+            " signature BLOB,"
+            " PRIMARY KEY (thread_id, submission_number)"
+            ") WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS entries_by_user ON entries (guild_id, user_id, closed_at);"
+            "CREATE INDEX IF NOT EXISTS entries_by_date ON entries (guild_id, closed_at);"
+            "CREATE INDEX IF NOT EXISTS entries_by_stars ON entries (guild_id, stars DESC);"
+            "CREATE TABLE IF NOT EXISTS user_stats ("
+            " guild_id INTEGER NOT NULL,"
+            " user_id INTEGER NOT NULL,"
+            " competitions INTEGER NOT NULL,"
+            " submissions INTEGER NOT NULL,"
+            " wins INTEGER NOT NULL,"
+            " podiums INTEGER NOT NULL,"
+            " stars INTEGER NOT NULL,"
+            " best_stars INTEGER NOT NULL,"
+            " PRIMARY KEY (guild_id, user_id)"
+            ") WITHOUT ROWID;"
+        )
+        # Archives written before signatures were stored get the column added; rows are backfilled below
+        if 'signature' not in [row[1] for row in conn.execute("PRAGMA table_info(entries)")]:
+            conn.execute("ALTER TABLE entries ADD COLUMN signature BLOB")
+        conn.commit()
+        self._conn = conn
+        self._load_indexes()
+
+        users = {
+            (row[0], row[1]): dict(zip(STAT_FIELDS, row[2:]))
+            for row in conn.execute(f"SELECT guild_id, user_id, {', '.join(STAT_FIELDS)} FROM user_stats")
+        }
+        competitions = dict(conn.execute("SELECT guild_id, COUNT(*) FROM competitions GROUP BY guild_id"))
+        top = {guild_id: self._select_top(guild_id) for guild_id in competitions}
+        return users, top, competitions
+
+    def _load_indexes(self) -> None:
+        # Built on the archive thread before any lookup can happen
+        for thread_id, guild_id, setup in self._conn.execute("SELECT thread_id, guild_id, setup FROM competitions"):
+            if self._owns(guild_id):
+                self.setups.add(thread_id, setup, guild_id)
+        backfill = []
+        rows = self._conn.execute("SELECT thread_id, submission_number, guild_id, punchline, signature FROM entries")
+        for thread_id, number, guild_id, punchline, blob in rows:
+            if not self._owns(guild_id):
+                continue
+            sig = array('Q', blob) if blob is not None else None
+            sig = self.punchlines.add((thread_id, number), punchline, guild_id, sig)
+            if blob is None:
+                backfill.append((sig.tobytes(), thread_id, number))
+        if backfill:
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE entries SET signature = ? WHERE thread_id = ? AND submission_number = ?", backfill
+                )
+
+    def _select_top(self, guild_id: int) -> List[Dict]:
+        rows = self._conn.execute(
+            "SELECT thread_id, message_id, user_id, punchline, stars, closed_at FROM entries"
+            " WHERE guild_id = ? AND stars > 0 ORDER BY stars DESC, closed_at LIMIT ?",
+            (guild_id, TOP_PUNCHLINES)
+        )
+        keys = ('thread_id', 'message_id', 'user_id', 'punchline', 'stars', 'closed_at')
+        return [dict(zip(keys, row)) for row in rows]
+
+    async def record(self, thread_id: int, guild_id: int, setup: str, entries: List[Dict],
+                     closed_at: Optional[float] = None) -> bool:
+        """Archive a closed competition and fold it into the aggregates.
+
+        ``entries`` are its punchlines ranked by stars, most first, each with
+        ``submission_number``, ``message_id``, ``user_id``, ``punchline`` and
+        ``stars``. Returns False if the competition was already archived, e.g.
+        when a close is retried.
+        """
+        if thread_id in self._recorded:
+            return False
+        closed_at = closed_at or time.time()
+        ranked = [dict(entry, place=place) for place, entry in enumerate(entries, 1)]
+        for entry in ranked:
+            key = (thread_id, entry['submission_number'])
+            entry['signature'] = self.punchlines.signature_of(key) or self.punchlines.add(key, entry['punchline'], guild_id)
+        if thread_id not in self.setups:
+            self.setups.add(thread_id, setup, guild_id)
+        deltas = self._deltas(ranked)
+        written = self._conn is None or await self._run(
+            self._write, thread_id, guild_id, setup, closed_at, ranked, deltas
+        )
+        self._recorded.add(thread_id)
+        if not written:
+            return False
+
+        for user_id, delta in deltas.items():
+            stats = self._users.setdefault((guild_id, user_id), dict.fromkeys(STAT_FIELDS, 0))
+            for field in STAT_FIELDS:
+                stats[field] = max(stats[field], delta[field]) if field == 'best_stars' else stats[field] + delta[field]
+        self._competitions[guild_id] = self._competitions.get(guild_id, 0) + 1
+
+        # Totals only grow, so the new top N is among the old top N and the users just updated
+        self._leaderboards[guild_id] = self._ranked(guild_id, set(self._leaderboards.get(guild_id, ())) | set(deltas))
+
+        top = self._top.get(guild_id, []) + [
+            {key: entry[key] for key in ('message_id', 'user_id', 'punchline', 'stars')}
+            | {'thread_id': thread_id, 'closed_at': closed_at}
+            for entry in ranked[:TOP_PUNCHLINES] if entry['stars'] > 0
+        ]
+        # Stable sort keeps older punchlines ahead of newer ones with as many stars
+        self._top[guild_id] = sorted(top, key=lambda entry: entry['stars'], reverse=True)[:TOP_PUNCHLINES]
+        return True
+
+    @staticmethod
+    def _deltas(ranked: List[Dict]) -> Dict[int, Dict[str, int]]:
+        deltas = {}
+        for entry in ranked:
+            delta = deltas.setdefault(entry['user_id'], dict.fromkeys(STAT_FIELDS, 0))
+            delta['competitions'] = 1
+            delta['submissions'] += 1
+            delta['stars'] += entry['stars']
+            delta['best_stars'] = max(delta['best_stars'], entry['stars'])
+            # A place only counts when somebody actually voted for it
+            if entry['stars'] > 0:
+                delta['wins'] += entry['place'] == 1
+                delta['podiums'] += entry['place'] <= 3
+        return deltas
+
+    def _write(self, thread_id, guild_id, setup, closed_at, ranked, deltas) -> bool:
+        with self._conn:
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO competitions (thread_id, guild_id, setup, closed_at, entries) VALUES (?, ?, ?, ?, ?)",
+                (thread_id, guild_id, setup, closed_at, len(ranked))
+            ).rowcount
+            if not inserted:
+                return False
+            self._conn.executemany(
+                "INSERT INTO entries (thread_id, submission_number, message_id, guild_id, user_id, punchline,"
+                " stars, place, closed_at, signature) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (thread_id, entry['submission_number'], entry['message_id'], guild_id, entry['user_id'],
+                     entry['punchline'], entry['stars'], entry['place'], closed_at,
+                     entry['signature'].tobytes())
+                    for entry in ranked
+                ]
+            )
+            self._conn.executemany(
+                f"INSERT INTO user_stats (guild_id, user_id, {', '.join(STAT_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (guild_id, user_id) DO UPDATE SET "
+                + ", ".join(
+                    f"{field} = MAX({field}, excluded.{field})" if field == 'best_stars'
+                    else f"{field} = {field} + excluded.{field}"
+                    for field in STAT_FIELDS
+                ),
+                [(guild_id, user_id, *(delta[field] for field in STAT_FIELDS)) for user_id, delta in deltas.items()]
+            )
+        return True
+
+    def _ranked(self, guild_id: int, user_ids) -> List[int]:
+        return sorted(
+            user_ids, key=lambda user_id: _rank(self._users[(guild_id, user_id)]), reverse=True
+        )[:LEADERBOARD_SIZE]
+
+    def is_archived(self, thread_id: int) -> bool:
+        """Whether ``thread_id`` was archived since this process started"""
+        return thread_id in self._recorded
+
+    def user_stats(self, guild_id: int, user_id: int) -> Optional[Dict[str, int]]:
+        stats = self._users.get((guild_id, user_id))
+        return dict(stats) if stats is not None else None
+
+    def leaderboard(self, guild_id: int) -> List[Tuple[int, Dict[str, int]]]:
+        return [(user_id, dict(self._users[(guild_id, user_id)])) for user_id in self._leaderboards.get(guild_id, ())]
+
+    def top_punchlines(self, guild_id: int) -> List[Dict]:
+        return list(self._top.get(guild_id, ()))
+
+    def competition_count(self, guild_id: int) -> int:
+        return self._competitions.get(guild_id, 0)
+
+    async def history(self, guild_id: int, user_id: Optional[int] = None, since: Optional[float] = None,
+                      limit: int = 25) -> List[Dict]:
+        """Archived punchlines of a guild, optionally of one user or since a time, newest first"""
+        if self._conn is None:
+            return []
+        query = "SELECT thread_id, submission_number, message_id, user_id, punchline, stars, place, closed_at FROM entries WHERE guild_id = ?"
+        args = [guild_id]
+        if user_id is not None:
+            query += " AND user_id = ?"
+            args.append(user_id)
+        if since is not None:
+            query += " AND closed_at >= ?"
+            args.append(since)
+        query += " ORDER BY closed_at DESC, place LIMIT ?"
+        args.append(limit)
+        keys = ('thread_id', 'submission_number', 'message_id', 'user_id', 'punchline', 'stars', 'place', 'closed_at')
+        rows = await self._run(lambda: self._conn.execute(query, args).fetchall())
+        return [dict(zip(keys, row)) for row in rows]
+
+    async def close(self) -> None:
+        if self._conn is None:
+            return
+        await self._run(self._conn.close)
+        self._conn = None
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        logger.info("Competition archive closed")
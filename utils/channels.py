@@ -0,0 +1,86 @@
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import discord
+
+logger = logging.getLogger('discord')
+
+# Channel names a timer's discussion thread goes to unless a guild configures its own
+DEFAULT_DISCUSSION_NAMES = ('script-discussions', 'script-discussion', 'scripts')
+
+
+def normalize_channel_name(name: str) -> str:
+    """``#Script-Discussions `` and ``script-discussions`` name the same channel"""
+    return name.strip().lstrip('#').strip().lower()
+
+
+class ChannelIndex:
+    """Per-guild map from normalized text channel name to the IDs of the channels with that name.
+
+    A guild is indexed from ``guild.text_channels`` the first time it is looked
+    up. After that the cog keeps it current through ``add`` and ``remove`` from
+    the channel create, update and delete events, so a lookup is a few dict
+    probes instead of a walk over every channel in the guild. Only IDs are
+    kept and resolved through ``guild.get_channel`` on lookup, so an entry
+    can't outlive its channel; a guild whose events may have been missed
+    (it was unavailable, or the session was re-identified) is ``forget``-ed
+    and indexed again.
+    """
+
+    def __init__(self):
+        self._guilds: Dict[int, Dict[str, List[int]]] = {}
+
+    def _index(self, guild: discord.Guild) -> Dict[str, List[int]]:
+        index = self._guilds.get(guild.id)
+        if index is None:
+            index = {}
+            for channel in guild.text_channels:
+                index.setdefault(normalize_channel_name(channel.name), []).append(channel.id)
+            self._guilds[guild.id] = index
+        return index
+
+    def find(self, guild: discord.Guild, names: Iterable[str]) -> Optional[discord.TextChannel]:
+        """The first channel matching ``names`` in order; the topmost one if several share a name"""
+        index = self._index(guild)
+        for name in names:
+            name = normalize_channel_name(name)
+            channel_ids = index.get(name)
+            if not channel_ids:
+                continue
+            channels = [guild.get_channel(channel_id) for channel_id in channel_ids]
+            # Deleted or renamed behind our back: drop the entry rather than return it
+            live = [channel for channel in channels if channel is not None and normalize_channel_name(channel.name) == name]
+            if len(live) != len(channels):
+                if live:
+                    index[name] = [channel.id for channel in live]
+                else:
+                    del index[name]
+            if live:
+                return min(live, key=lambda channel: (channel.position, channel.id))
+        return None
+
+    def add(self, channel: discord.abc.GuildChannel) -> None:
+        # A guild that was never looked up is indexed in full on first use instead
+        index = self._guilds.get(channel.guild.id)
+        if index is None:
+            return
+        channel_ids = index.setdefault(normalize_channel_name(channel.name), [])
+        if channel.id not in channel_ids:
+            channel_ids.append(channel.id)
+
+    def remove(self, channel: discord.abc.GuildChannel) -> None:
+        index = self._guilds.get(channel.guild.id)
+        if index is None:
+            return
+        name = normalize_channel_name(channel.name)
+        remaining = [channel_id for channel_id in index.get(name, ()) if channel_id != channel.id]
+        if remaining:
+            index[name] = remaining
+        else:
+            index.pop(name, None)
+
+    def forget(self, guild_id: int) -> None:
+        self._guilds.pop(guild_id, None)
+
+    def clear(self) -> None:
+        self._guilds.clear()
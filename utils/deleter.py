@@ -0,0 +1,61 @@
+import asyncio
+import logging
+from typing import Dict, List, Set
+
+import discord
+
+logger = logging.getLogger('discord')
+
+# Discord's limit on messages per bulk-delete call
+BULK_DELETE_MAX = 100
+
+
+class BulkDeleter:
+    """Batches message deletions per channel into bulk-delete calls.
+
+    ``queue`` returns at once. The first message queued for a channel opens a
+    ``window``-second batch; everything queued for that channel until then
+    goes out in as few ``delete_messages`` calls as possible, up to 100
+    messages each (a batch of one is a plain delete). A burst of stragglers
+    costs one REST call instead of one per message.
+    """
+
+    def __init__(self, window: float = 1.0):
+        self.window = window
+        self._pending: Dict[int, List[discord.Message]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def queue(self, message: discord.Message) -> None:
+        channel = message.channel
+        batch = self._pending.get(channel.id)
+        if batch is not None:
+            batch.append(message)
+            return
+        self._pending[channel.id] = [message]
+        task = asyncio.create_task(self._flush_later(channel), name=f"bulk-delete-{channel.id}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush_later(self, channel) -> None:
+        await asyncio.sleep(self.window)
+        await self._flush(channel)
+
+    async def _flush(self, channel) -> None:
+        batch = self._pending.pop(channel.id, [])
+        for start in range(0, len(batch), BULK_DELETE_MAX):
+            chunk = batch[start:start + BULK_DELETE_MAX]
+            try:
+                await channel.delete_messages(chunk)
+            except discord.Forbidden:
+                logger.warning("Bot doesn't have permission to delete messages", extra={'thread_id': channel.id})
+                return
+            except discord.HTTPException as e:
+                # e.g. one of them was already deleted by a moderator
+                logger.warning(f"Bulk delete of {len(chunk)} messages failed: {e}", extra={'thread_id': channel.id})
+
+    async def close(self) -> None:
+        """Send every open batch now instead of waiting for its window"""
+        for task in list(self._tasks):
+            task.cancel()
+        channels = [batch[0].channel for batch in self._pending.values()]
+        await asyncio.gather(*(self._flush(channel) for channel in channels))
@@ -0,0 +1,29 @@
+import logging
+from typing import Iterable
+
+logger = logging.getLogger('discord')
+
+
+def hand_off(cog, attributes: Iterable[str]) -> None:
+    """Leave a cog's live state on the bot for the instance that replaces it on reload.
+
+    The objects themselves are passed on, not copies, so work the old instance
+    still has in flight (a close, a queued submission) keeps updating the same
+    state the new instance sees.
+    """
+    cog.bot.cog_handoff[cog.qualified_name] = {name: getattr(cog, name) for name in attributes}
+
+
+def take_over(cog, attributes: Iterable[str], scheduled_kinds: Iterable[str]) -> bool:
+    """Adopt state left by ``hand_off`` and move pending deadlines to this instance.
+
+    Returns False when there is nothing to take over, i.e. on a fresh start.
+    """
+    state = cog.bot.cog_handoff.pop(cog.qualified_name, None)
+    if state is None:
+        return False
+    for name in attributes:
+        setattr(cog, name, state[name])
+    rebound = sum(cog.scheduler.rebind(kind, cog) for kind in scheduled_kinds)
+    logger.info(f"{cog.qualified_name} took over live state and {rebound} scheduled callbacks")
+    return True
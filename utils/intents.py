@@ -0,0 +1,39 @@
+from typing import Any, Dict
+
+import discord
+
+# Messages kept in discord.py's message cache in the lean profile. The cogs
+# read reactions from raw events and fetch anything older, so only recent
+# messages (e.g. for prefix commands) need to stay in memory.
+LEAN_MAX_MESSAGES = 100
+
+
+def lean_intents() -> discord.Intents:
+    """Only what the cogs use: guild channels and threads, message text and reactions"""
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.guild_messages = True
+    intents.dm_messages = True
+    intents.message_content = True
+    intents.guild_reactions = True
+    return intents
+
+
+def client_options(profile: str = 'lean') -> Dict[str, Any]:
+    """Keyword arguments for the bot's constructor in the ``lean`` or ``full`` cache profile.
+
+    ``full`` is the original configuration: every intent, with every member and
+    presence of every guild cached. ``lean`` drops the member and presence
+    intents, caches no members and doesn't chunk guilds at startup; authors are
+    mentioned by ID, which needs no member lookup.
+    """
+    if profile == 'full':
+        return {'intents': discord.Intents.all()}
+    if profile != 'lean':
+        raise ValueError(f"Unknown cache profile {profile!r}, expected 'lean' or 'full'")
+    return {
+        'intents': lean_intents(),
+        'member_cache_flags': discord.MemberCacheFlags.none(),
+        'chunk_guilds_at_startup': False,
+        'max_messages': LEAN_MAX_MESSAGES,
+    }
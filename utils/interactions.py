@@ -0,0 +1,90 @@
+import asyncio
+import functools
+import logging
+import time
+from typing import Awaitable, Callable, Optional, Set
+
+import discord
+
+logger = logging.getLogger('discord')
+
+
+class JobQueue:
+    """Runs the slow part of app commands as tracked background tasks.
+
+    At most ``limit`` jobs run at once; the rest wait their turn. Each job's
+    wait is observed in ``interaction_job_queue_seconds`` and its run in
+    ``interaction_job_seconds``, both by command. Running jobs are tracked
+    so shutdown can cancel them instead of leaving them behind.
+    """
+
+    def __init__(self, metrics, limit: int = 8):
+        self.metrics = metrics
+        self.slots = asyncio.Semaphore(limit)
+        self.jobs: Set[asyncio.Task] = set()
+
+    def submit(self, name: str, job: Callable[[], Awaitable]) -> asyncio.Task:
+        queued_at = time.perf_counter()
+
+        async def run():
+            async with self.slots:
+                self.metrics.observe('interaction_job_queue_seconds', time.perf_counter() - queued_at, command=name)
+                async with self.metrics.track(name, 'interaction_job_seconds'):
+                    return await job()
+
+        task = asyncio.create_task(run(), name=f"interaction-job-{name}")
+        self.jobs.add(task)
+        task.add_done_callback(self.jobs.discard)
+        return task
+
+    async def drain(self) -> None:
+        """Wait for every submitted job, including ones submitted while waiting"""
+        while self.jobs:
+            await asyncio.gather(*list(self.jobs), return_exceptions=True)
+
+    async def close(self) -> None:
+        for task in list(self.jobs):
+            task.cancel()
+        await self.drain()
+
+
+def deferred(*, ephemeral: bool = True, thinking: bool = True, error: str = "❌ Something went wrong. Please try again."):
+    """Acknowledge an app command at once and finish it as a background job.
+
+    Discord wants a response within 3 seconds, so the interaction is
+    deferred before anything else, and the command body runs as a job on
+    ``cog.bot.jobs``. Whatever the body returns (a string, or a dict of
+    ``edit_original_response`` arguments) replaces the "thinking..." response.
+    If it raises, ``error`` does. The body must not use
+    ``interaction.response``, because the interaction is already answered.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(cog, interaction: discord.Interaction, *args, **kwargs):
+            await interaction.response.defer(ephemeral=ephemeral, thinking=thinking)
+
+            async def job():
+                try:
+                    result = await func(cog, interaction, *args, **kwargs)
+                except Exception as e:
+                    logger.exception(
+                        "Error in background job for /%s: %s", func.__name__, e,
+                        extra={'channel_id': interaction.channel_id}
+                    )
+                    result = error
+                await _finish(interaction, result)
+
+            cog.bot.jobs.submit(func.__name__, job)
+        return wrapper
+    return decorator
+
+
+async def _finish(interaction: discord.Interaction, result: Optional[object]) -> None:
+    if result is None:
+        return
+    edit = result if isinstance(result, dict) else {'content': str(result)}
+    try:
+        await interaction.edit_original_response(**edit)
+    except discord.HTTPException as e:
+        # The interaction token lives for 15 minutes; a job that outlives it can't report back
+        logger.warning("Could not edit response for interaction %s: %s", interaction.id, e)
@@ -0,0 +1,148 @@
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Log rate limits are written in the same spec as submission limits; re-exported for the log config
+from utils.ratelimit import parse_rate_limits
+
+# Attributes every LogRecord has; anything else on a record came in through ``extra=``
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+# Category -> (records let through per window, window in seconds). Records tag
+# their category with ``extra={'category': ...}``; untagged records are never limited.
+DEFAULT_RATE_LIMITS: Dict[str, Tuple[int, float]] = {
+    'submission': (30, 60.0),
+    'tally': (10, 60.0),
+}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and any ``extra=`` fields
+    such as ``thread_id``, ``competition_id`` or ``category``"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets through at most ``count`` records per ``window`` seconds for each limited category.
+
+    Dropped records are counted, and the first record let through after a
+    drop carries the count as ``suppressed`` so the gap is visible in the log.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[int, float]], metrics=None):
+        super().__init__()
+        self.limits = limits
+        self.metrics = metrics
+        # category -> [window start, records let through, records dropped]
+        self._windows: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        category = getattr(record, 'category', None)
+        limit = self.limits.get(category)
+        if limit is None:
+            return True
+        count, window = limit
+        now = time.monotonic()
+        with self._lock:
+            state = self._windows.get(category)
+            if state is None or now - state[0] >= window:
+                state = self._windows[category] = [now, 0, state[2] if state else 0]
+            if state[1] >= count:
+                state[2] += 1
+                if self.metrics:
+                    self.metrics.inc('log_records_suppressed_total', category=category)
+                return False
+            state[1] += 1
+            if state[2]:
+                record.suppressed = state[2]
+                state[2] = 0
+        return True
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves the output formatting to the listener thread.
+
+    Like the stock ``prepare``, the message (``msg % args``) and any
+    traceback are rendered on the logging thread, since the arguments are
+    live objects the event loop keeps changing. Unlike it, the record is not
+    run through the output formatter here: timestamps, JSON and the write
+    itself happen on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        record = copy.copy(record)
+        record.msg = message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class LogPipeline:
+    """Root logging through a queue: callers only filter and enqueue a record,
+    a listener thread formats it and does the I/O.
+
+    ``fmt`` is ``'json'`` for structured records or ``'text'`` for the usual
+    one-line format.
+    """
+
+    def __init__(self, level: int = logging.INFO, fmt: str = 'json',
+                 rate_limits: Optional[Dict[str, Tuple[int, float]]] = None, stream=None):
+        self.level = level
+        output = logging.StreamHandler(stream or sys.stderr)
+        if fmt == 'json':
+            output.setFormatter(JsonFormatter())
+        else:
+            output.setFormatter(logging.Formatter('[%(asctime)s] [%(levelname)-8s] %(name)s: %(message)s'))
+        self.limiter = RateLimitFilter(DEFAULT_RATE_LIMITS if rate_limits is None else rate_limits)
+        self.queue = queue.SimpleQueue()
+        self.handler = DeferredQueueHandler(self.queue)
+        self.handler.addFilter(self.limiter)
+        self.listener = logging.handlers.QueueListener(self.queue, output, respect_handler_level=True)
+        self._started = False
+
+    def install(self) -> None:
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(self.level)
+        self.listener.start()
+        self._started = True
+
+    def instrument(self, metrics) -> None:
+        """Count records dropped by the rate limits in ``metrics``"""
+        self.limiter.metrics = metrics
+
+    def close(self) -> None:
+        """Write out everything still queued and stop the listener thread"""
+        if self._started:
+            self.listener.stop()
+            self._started = False
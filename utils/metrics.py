@@ -0,0 +1,275 @@
+import asyncio
+import contextlib
+import contextvars
+import logging
+import math
+import time
+from collections import defaultdict
+from typing import Dict, Optional, Sequence, Tuple
+
+import discord
+from discord import app_commands
+
+logger = logging.getLogger('discord')
+
+# Command, listener or background job the current task is working for.
+# Tasks inherit it from whoever created them, so REST calls made by spawned
+# work are still attributed to the operation that started it.
+current_operation = contextvars.ContextVar('current_operation', default='other')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Labels, extra: str = '') -> str:
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Histogram:
+    """Fixed-bucket histogram; cumulative counts are computed when rendered"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            index = len(self.buckets)
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """In-process counters, gauges and histograms rendered in Prometheus text format.
+
+    Everything is keyed by metric name plus a label dict. Updates are plain
+    dict operations on the event loop, so they are cheap enough to sit on
+    every command, listener and REST call.
+    """
+
+    def __init__(self, prefix: str = 'sketchy'):
+        self.prefix = prefix
+        self.help: Dict[str, Tuple[str, str]] = {}
+        self.counters: Dict[str, Dict[Labels, float]] = defaultdict(lambda: defaultdict(float))
+        self.gauges: Dict[str, Dict[Labels, float]] = defaultdict(dict)
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = defaultdict(dict)
+        self._buckets: Dict[str, Sequence[float]] = {}
+
+    def describe(self, name: str, kind: str, text: str, buckets: Optional[Sequence[float]] = None) -> None:
+        self.help[name] = (kind, text)
+        if buckets is not None:
+            self._buckets[name] = buckets
+
+    def inc(self, name: str, amount: float = 1.0, **labels) -> None:
+        self.counters[name][_labels(labels)] += amount
+
+    def set(self, name: str, value: float, **labels) -> None:
+        self.gauges[name][_labels(labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _labels(labels)
+        histogram = self.histograms[name].get(key)
+        if histogram is None:
+            histogram = self.histograms[name][key] = Histogram(self._buckets.get(name, LATENCY_BUCKETS))
+        histogram.observe(value)
+
+    @contextlib.asynccontextmanager
+    async def track(self, operation: str, metric: str = 'operation_seconds', **labels):
+        """Time the block into ``metric`` and attribute its REST calls to ``operation``"""
+        token = current_operation.set(operation)
+        status = 'ok'
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            self.observe(metric, time.perf_counter() - start, operation=operation, status=status, **labels)
+            current_operation.reset(token)
+
+    def render(self) -> str:
+        lines = []
+
+        def header(name: str, default_kind: str) -> None:
+            kind, text = self.help.get(name, (default_kind, ''))
+            full = f"{self.prefix}_{name}"
+            if text:
+                lines.append(f"# HELP {full} {text}")
+            lines.append(f"# TYPE {full} {kind}")
+
+        for name, series in sorted(self.counters.items()):
+            header(name, 'counter')
+            for labels, value in sorted(series.items()):
+                lines.append(f"{self.prefix}_{name}{_format_labels(labels)} {_format_value(value)}")
+        for name, series in sorted(self.gauges.items()):
+            header(name, 'gauge')
+            for labels, value in sorted(series.items()):
+                lines.append(f"{self.prefix}_{name}{_format_labels(labels)} {_format_value(value)}")
+        for name, series in sorted(self.histograms.items()):
+            header(name, 'histogram')
+            full = f"{self.prefix}_{name}"
+            for labels, histogram in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (math.inf,), histogram.counts):
+                    cumulative += count
+                    le = 'le="' + _format_value(bound) + '"'
+                    lines.append(f"{full}_bucket{_format_labels(labels, le)} {cumulative}")
+                lines.append(f"{full}_sum{_format_labels(labels)} {histogram.sum!r}")
+                lines.append(f"{full}_count{_format_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+
+def describe_bot_metrics(metrics: Metrics) -> None:
+    metrics.describe('command_seconds', 'histogram', 'App command latency')
+    metrics.describe('event_seconds', 'histogram', 'Gateway event listener latency')
+    metrics.describe('operation_seconds', 'histogram', 'Background operation latency, e.g. competition closes')
+    metrics.describe('interaction_job_queue_seconds', 'histogram', 'Time a deferred command job waited for a job slot')
+    metrics.describe('interaction_job_seconds', 'histogram', 'Deferred command job run time, after the interaction was acknowledged')
+    metrics.describe('submissions_throttled_total', 'counter', 'Submissions dropped by the per-user or per-thread limit, by scope')
+    metrics.describe('submission_cooldown_notices_total', 'counter', 'Slow-down notices sent to throttled authors')
+    metrics.describe('close_slot_wait_seconds', 'histogram', 'Time a competition close waited for a free close slot')
+    metrics.describe('rest_requests_total', 'counter', 'Discord REST requests by route and originating operation')
+    metrics.describe('rest_request_seconds', 'histogram', 'Discord REST request latency including rate-limit waits')
+    metrics.describe('rate_limit_wait_seconds_total', 'counter', 'Time spent waiting on discord.py rate-limit buckets')
+    metrics.describe('rate_limit_hits_total', 'counter', '429 responses received from Discord')
+    metrics.describe('gateway_latency_seconds', 'gauge', 'Gateway heartbeat latency')
+    metrics.describe('gateway_disconnects_total', 'counter', 'Gateway connection losses by reason')
+    metrics.describe('gateway_recovery_seconds', 'histogram', 'Time from losing the gateway to resuming or re-identifying')
+    metrics.describe('reconnect_backoff_seconds_total', 'counter', 'Time spent sleeping in reconnect backoff')
+    metrics.describe('time_to_ready_seconds', 'gauge', 'Time from start to the last on_ready')
+    metrics.describe('event_loop_lag_seconds', 'histogram', 'How late the event loop ran a periodic probe', LAG_BUCKETS)
+    metrics.describe('event_loop_stalls_total', 'counter', 'Event loop lags over the stall threshold')
+    metrics.describe('log_records_suppressed_total', 'counter', 'Log records dropped by per-category rate limits')
+
+
+class MetricsCommandTree(app_commands.CommandTree):
+    """Command tree that times every app command and labels its REST calls with the command name"""
+
+    async def _call(self, interaction: discord.Interaction) -> None:
+        name = (interaction.data or {}).get('name', 'unknown')
+        async with self.client.metrics.track(name, 'command_seconds'):
+            await super()._call(interaction)
+
+
+def instrument_http(metrics: Metrics, http) -> None:
+    """Count and time REST requests per route template and operation"""
+    request = http.request
+
+    async def counted_request(route, **kwargs):
+        labels = {'route': f"{route.method} {route.path}", 'operation': current_operation.get()}
+        metrics.inc('rest_requests_total', **labels)
+        start = time.perf_counter()
+        try:
+            return await request(route, **kwargs)
+        finally:
+            metrics.observe('rest_request_seconds', time.perf_counter() - start, **labels)
+
+    http.request = counted_request
+
+
+def instrument_rate_limits(metrics: Metrics) -> None:
+    """Measure time spent queued in discord.py's rate-limit buckets and sleeping on 429s.
+
+    ``Ratelimit`` uses ``__slots__``, so the bucket wait is captured by wrapping
+    ``acquire`` on the class; 429 retries are only visible in discord.http's
+    warning log records, which carry ``retry_after`` as their last argument.
+    """
+    ratelimit = discord.http.Ratelimit
+    if not getattr(ratelimit.acquire, '_metered', False):
+        acquire = ratelimit.acquire
+
+        async def metered_acquire(self):
+            start = time.perf_counter()
+            try:
+                await acquire(self)
+            finally:
+                waited = time.perf_counter() - start
+                if waited > 0.001:
+                    metrics.inc('rate_limit_wait_seconds_total', waited, operation=current_operation.get(), kind='bucket')
+
+        metered_acquire._metered = True
+        ratelimit.acquire = metered_acquire
+
+    class RateLimitLogFilter(logging.Filter):
+        def filter(self, record: logging.LogRecord) -> bool:
+            if isinstance(record.msg, str) and record.msg.startswith(('We are being rate limited', 'Global rate limit')):
+                retry_after = record.args[-1] if record.args else 0
+                scope = 'global' if record.msg.startswith('Global') else 'route'
+                metrics.inc('rate_limit_hits_total', operation=current_operation.get(), scope=scope)
+                if 'Retrying' in record.msg:
+                    metrics.inc('rate_limit_wait_seconds_total', float(retry_after), operation=current_operation.get(), kind='429')
+            return True
+
+    logging.getLogger('discord.http').addFilter(RateLimitLogFilter())
+
+
+class MetricsServer:
+    """Serves ``Metrics.render()`` on ``/metrics`` and samples gateway latency"""
+
+    def __init__(self, metrics: Metrics, bot, host: str = '127.0.0.1', port: int = 9108, probe_interval: float = 1.0):
+        self.metrics = metrics
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.probe_interval = probe_interval
+        self._runner = None
+        self._probe: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        from aiohttp import web
+
+        if self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self._probe = asyncio.create_task(self._probe_loop())
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def _handle(self, request):
+        from aiohttp import web
+
+        return web.Response(text=self.metrics.render(), content_type='text/plain', charset='utf-8')
+
+    async def _probe_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            latency = self.bot.latency
+            if math.isfinite(latency):
+                self.metrics.set('gateway_latency_seconds', latency)
+
+    async def close(self) -> None:
+        if self._probe:
+            self._probe.cancel()
+            self._probe = None
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
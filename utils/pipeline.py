@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+logger = logging.getLogger('discord')
+
+
+class SubmissionPipeline:
+    """Ordered, bounded processing of one competition thread's submissions.
+
+    A submission takes a turn when it is admitted, so publishing follows
+    admission order under concurrency. Preparation (attachment downloads) runs
+    concurrently across admitted submissions, but ``publish`` calls happen
+    strictly in turn order, and the submission number is handed out right
+    before ``publish``: numbers stay unique and gapless even when a
+    preparation fails. At most ``max_in_flight`` submissions are admitted at
+    once; later submitters wait for a slot, which bounds the downloads and
+    files held in memory during a burst. A submission that fails or is
+    cancelled anywhere after admission still gives up its turn, so the ones
+    behind it are never stuck waiting.
+    """
+
+    def __init__(self, max_in_flight: int = 8, last_number: int = 0):
+        self._slots = asyncio.Semaphore(max_in_flight)
+        # Last number handed to ``publish``
+        self.last_number = last_number
+        self._last_turn = 0
+        self._next_turn = 1
+        # Turns finished before they came up, e.g. cancelled while preparing
+        self._finished: Set[int] = set()
+        # turn -> future resolved when that turn comes up
+        self._waiters: Dict[int, asyncio.Future] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return self._last_turn - self._next_turn + 1
+
+    async def _wait_turn(self, turn: int) -> None:
+        if self._next_turn == turn:
+            return
+        waiter = self._waiters[turn] = asyncio.get_running_loop().create_future()
+        try:
+            await waiter
+        finally:
+            self._waiters.pop(turn, None)
+
+    def _advance(self, turn: int) -> None:
+        """Mark ``turn`` finished; synchronous, so it also runs in a task being cancelled"""
+        self._finished.add(turn)
+        while self._next_turn in self._finished:
+            self._finished.discard(self._next_turn)
+            self._next_turn += 1
+        waiter = self._waiters.get(self._next_turn)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def submit(
+        self,
+        prepare: Callable[[], Awaitable[Any]],
+        publish: Callable[[int, Any], Awaitable[Any]],
+    ) -> Optional[Any]:
+        """Admit a submission, prepare it, then number and publish it once every earlier one is done.
+
+        Returns whatever ``publish`` returns, or None when preparation failed.
+        """
+        async with self._slots:
+            # No await between admission and taking a turn keeps turns in admission order
+            self._last_turn += 1
+            turn = self._last_turn
+
+            try:
+                try:
+                    payload = await prepare()
+                    prepared = True
+                except Exception as e:
+                    logger.error(f"Failed to prepare submission: {e}")
+                    payload, prepared = None, False
+
+                await self._wait_turn(turn)
+                if not prepared:
+                    return None
+                self.last_number += 1
+                return await publish(self.last_number, payload)
+            finally:
+                self._advance(turn)
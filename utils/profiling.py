@@ -0,0 +1,108 @@
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import tempfile
+import tracemalloc
+from typing import List
+
+import discord
+
+logger = logging.getLogger('discord')
+
+# Bounds on the overhead an in-place profile may add to the live bot
+MAX_PROFILE_SECONDS = 120
+TRACEMALLOC_FRAMES = 10
+
+# Only one profile runs at a time; cProfile and tracemalloc are process-wide
+_profile_lock = asyncio.Lock()
+
+
+def _clamp(seconds: int) -> int:
+    return max(1, min(int(seconds), MAX_PROFILE_SECONDS))
+
+
+def profile_busy() -> bool:
+    return _profile_lock.locked()
+
+
+async def profile_cpu(seconds: int, top: int = 60) -> List[discord.File]:
+    """cProfile the event-loop thread for ``seconds``.
+
+    Returns a pstats text report sorted by cumulative time and the raw
+    ``.prof`` dump for snakeviz/pstats.
+    """
+    seconds = _clamp(seconds)
+    async with _profile_lock:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+
+    report = io.StringIO()
+    report.write(f"CPU profile of the event-loop thread over {seconds}s\n\n")
+    stats = pstats.Stats(profiler, stream=report)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+
+    fd, path = tempfile.mkstemp(suffix='.prof')
+    os.close(fd)
+    try:
+        profiler.dump_stats(path)
+        with open(path, 'rb') as fh:
+            raw = fh.read()
+    finally:
+        os.unlink(path)
+
+    return [
+        discord.File(io.BytesIO(report.getvalue().encode()), filename='cpu_profile.txt'),
+        discord.File(io.BytesIO(raw), filename='cpu_profile.prof'),
+    ]
+
+
+async def profile_memory(seconds: int, top: int = 40) -> List[discord.File]:
+    """Diff tracemalloc snapshots taken ``seconds`` apart.
+
+    If tracing isn't already on (e.g. via PYTHONTRACEMALLOC) it is started for
+    the window only, so allocations made before the baseline are not tracked
+    and the diff shows what grew during the window.
+    """
+    seconds = _clamp(seconds)
+    async with _profile_lock:
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        try:
+            baseline = tracemalloc.take_snapshot()
+            await asyncio.sleep(seconds)
+            snapshot = tracemalloc.take_snapshot()
+            traced, peak = tracemalloc.get_traced_memory()
+        finally:
+            if started_here:
+                tracemalloc.stop()
+
+    ignore = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    ]
+    baseline = baseline.filter_traces(ignore)
+    snapshot = snapshot.filter_traces(ignore)
+    report = io.StringIO()
+    report.write(
+        f"Allocation growth over {seconds}s "
+        f"(traced now {traced / 1024:.0f} KiB, peak {peak / 1024:.0f} KiB)\n\n"
+        f"Top {top} lines by growth:\n"
+    )
+    for stat in snapshot.compare_to(baseline, 'lineno')[:top]:
+        report.write(f"{stat}\n")
+
+    report.write(f"\nTop {min(top, 10)} allocation sites by growth, with tracebacks:\n")
+    for stat in snapshot.compare_to(baseline, 'traceback')[:min(top, 10)]:
+        report.write(f"\n{stat.size_diff / 1024:+.1f} KiB in {stat.count_diff:+d} blocks\n")
+        report.write("\n".join(stat.traceback.format()) + "\n")
+
+    return [discord.File(io.BytesIO(report.getvalue().encode()), filename='memory_profile.txt')]
@@ -0,0 +1,104 @@
+import time
+from typing import Dict, Optional, Tuple
+
+# Scopes a SubmissionLimiter understands: one author in one thread, and a thread as a whole
+SCOPES = ('user', 'thread')
+
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[int, float]]:
+    """``"user=5/30,thread=60/60"``: at most 5 per 30 seconds in the ``user`` scope, and so on.
+    The window defaults to 60 seconds"""
+    limits = {}
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        key, _, rate = part.partition('=')
+        count, _, window = rate.partition('/')
+        limits[key.strip()] = (int(count), float(window or 60))
+    return limits
+
+
+class TokenBucket:
+    """``capacity`` tokens, refilled continuously at ``capacity`` per ``window`` seconds"""
+
+    __slots__ = ('capacity', 'rate', 'tokens', 'updated')
+
+    def __init__(self, capacity: int, window: float, now: float):
+        self.capacity = capacity
+        self.rate = capacity / window
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def refill(self, now: float) -> float:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.tokens
+
+    def wait(self) -> float:
+        """Seconds until a token is available, as of the last refill"""
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class SubmissionLimiter:
+    """Token-bucket limits on submissions per author per thread and per thread.
+
+    ``limits`` maps a scope (``user`` or ``thread``) to ``(count, window)``:
+    bursts of up to ``count`` messages, refilled at ``count`` per ``window``
+    seconds. A missing scope is unlimited. ``check`` is a few dict lookups and
+    takes a token from both buckets only when both have one, so a message the
+    thread limit rejects doesn't also use up its author's allowance.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[int, float]]):
+        unknown = set(limits) - set(SCOPES)
+        if unknown:
+            raise ValueError(f"Unknown submission limit scopes {sorted(unknown)}, expected {SCOPES}")
+        self.limits = limits
+        self._threads: Dict[int, TokenBucket] = {}
+        # thread_id -> user_id -> bucket, so a closed thread's buckets go in one step
+        self._users: Dict[int, Dict[int, TokenBucket]] = {}
+        # thread_id -> user_id -> monotonic time until which the author has been told to slow down
+        self._notified: Dict[int, Dict[int, float]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.limits)
+
+    def _bucket(self, buckets: Dict[int, TokenBucket], key: int, scope: str, now: float) -> Optional[TokenBucket]:
+        limit = self.limits.get(scope)
+        if limit is None:
+            return None
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TokenBucket(*limit, now)
+        return bucket
+
+    def check(self, thread_id: int, user_id: int) -> Tuple[Optional[str], float]:
+        """``(None, 0)`` if the submission may go ahead, else the exhausted scope and seconds until it refills"""
+        if not self.limits:
+            return None, 0.0
+        now = time.monotonic()
+        user = self._bucket(self._users.setdefault(thread_id, {}), user_id, 'user', now)
+        thread = self._bucket(self._threads, thread_id, 'thread', now)
+        for scope, bucket in (('user', user), ('thread', thread)):
+            if bucket is not None and bucket.refill(now) < 1:
+                return scope, bucket.wait()
+        for bucket in (user, thread):
+            if bucket is not None:
+                bucket.tokens -= 1
+        return None, 0.0
+
+    def should_notify(self, thread_id: int, user_id: int, retry_after: float) -> bool:
+        """True once per cooldown, so a burst of throttled messages gets a single notice"""
+        now = time.monotonic()
+        notified = self._notified.setdefault(thread_id, {})
+        if notified.get(user_id, 0.0) > now:
+            return False
+        notified[user_id] = now + retry_after
+        return True
+
+    def forget(self, thread_id: int) -> None:
+        self._threads.pop(thread_id, None)
+        self._users.pop(thread_id, None)
+        self._notified.pop(thread_id, None)
@@ -0,0 +1,79 @@
+import logging
+import random
+import time
+from typing import Dict, Optional
+
+import discord
+
+logger = logging.getLogger('discord')
+
+# Close codes that mean the session can't be fixed by reconnecting
+# (bad token, invalid shard or intents); these are raised instead of retried
+FATAL_CLOSE_CODES = frozenset({4004, 4010, 4011, 4012, 4013, 4014})
+
+
+def disconnect_reason(exc: BaseException) -> str:
+    """Label for a gateway failure: ConnectionClosed, GatewayNotFound, HTTPException or network"""
+    for kind in (discord.ConnectionClosed, discord.GatewayNotFound, discord.HTTPException):
+        if isinstance(exc, kind):
+            return kind.__name__
+    return 'network'
+
+
+class Backoff:
+    """Exponential backoff with full jitter: ``uniform(0, min(cap, base * 2**attempt))``.
+
+    Full jitter spreads reconnects out when many clients (or shards) drop at
+    once, instead of having them all retry in lockstep.
+    """
+
+    def __init__(self, base: float = 1.0, cap: float = 300.0, rng: Optional[random.Random] = None):
+        self.base = base
+        self.cap = cap
+        self.attempts = 0
+        self._rng = rng or random.Random()
+
+    def next(self) -> float:
+        ceiling = min(self.cap, self.base * 2 ** min(self.attempts, 32))
+        self.attempts += 1
+        return self._rng.uniform(0, ceiling)
+
+    def reset(self) -> None:
+        self.attempts = 0
+
+
+class ReconnectController:
+    """Backoff and time-to-recover accounting for gateway connections.
+
+    ``disconnected`` marks the start of an outage for a connection (the
+    shard ID, or None when unsharded) with the reason that caused it;
+    ``recovered`` closes it once the session resumed or re-identified. Each
+    outage is observed in ``gateway_recovery_seconds`` by reason and how it
+    recovered; the backoff resets on every recovery.
+    """
+
+    def __init__(self, metrics, base: float = 1.0, cap: float = 300.0):
+        self.metrics = metrics
+        self.backoff = Backoff(base, cap)
+        self._outages: Dict[Optional[int], tuple] = {}
+
+    def disconnected(self, reason: str, shard_id: Optional[int] = None) -> None:
+        self.metrics.inc('gateway_disconnects_total', reason=reason)
+        # The first failure of an outage is its cause; retries while down don't restart the clock
+        self._outages.setdefault(shard_id, (reason, time.monotonic()))
+
+    def delay(self) -> float:
+        delay = self.backoff.next()
+        self.metrics.inc('reconnect_backoff_seconds_total', delay)
+        return delay
+
+    def recovered(self, how: str, shard_id: Optional[int] = None) -> None:
+        outage = self._outages.pop(shard_id, None)
+        self.backoff.reset()
+        if outage is None:
+            return
+        reason, since = outage
+        elapsed = time.monotonic() - since
+        self.metrics.observe('gateway_recovery_seconds', elapsed, reason=reason, how=how)
+        shard = '' if shard_id is None else f" (shard {shard_id})"
+        logger.info(f"Gateway recovered{shard} by {how} {elapsed:.2f}s after {reason}")
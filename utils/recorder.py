@@ -0,0 +1,145 @@
+import asyncio
+import gzip
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger('discord')
+
+# Gateway dispatches the cogs react to, plus the bot's own thread creations
+# which the replay engine needs to line recorded IDs up with replayed ones
+RECORDED_EVENTS = (
+    'MESSAGE_CREATE',
+    'MESSAGE_REACTION_ADD',
+    'MESSAGE_REACTION_REMOVE',
+    'MESSAGE_REACTION_REMOVE_ALL',
+    'MESSAGE_REACTION_REMOVE_EMOJI',
+    'INTERACTION_CREATE',
+    'THREAD_CREATE',
+)
+
+
+def _slim_user(user: Optional[Dict]) -> Optional[Dict]:
+    if not user:
+        return None
+    return {'id': user['id'], 'username': user.get('username'), 'bot': user.get('bot', False)}
+
+
+def _slim_attachment(attachment: Dict) -> Dict:
+    return {key: attachment.get(key) for key in ('id', 'filename', 'content_type', 'size', 'url')}
+
+
+def slim_payload(event: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the fields the cogs and the replay engine read"""
+    if event == 'MESSAGE_CREATE':
+        return {
+            'id': data['id'],
+            'channel_id': data['channel_id'],
+            'guild_id': data.get('guild_id'),
+            'content': data.get('content', ''),
+            'author': _slim_user(data.get('author')),
+            'attachments': [_slim_attachment(a) for a in data.get('attachments', [])],
+        }
+    if event in ('MESSAGE_REACTION_ADD', 'MESSAGE_REACTION_REMOVE'):
+        emoji = data.get('emoji') or {}
+        return {
+            'message_id': data['message_id'],
+            'channel_id': data['channel_id'],
+            'guild_id': data.get('guild_id'),
+            'user_id': data['user_id'],
+            'emoji': {'id': emoji.get('id'), 'name': emoji.get('name')},
+        }
+    if event in ('MESSAGE_REACTION_REMOVE_ALL', 'MESSAGE_REACTION_REMOVE_EMOJI'):
+        slim = {key: data.get(key) for key in ('message_id', 'channel_id', 'guild_id')}
+        if 'emoji' in data:
+            slim['emoji'] = {'id': data['emoji'].get('id'), 'name': data['emoji'].get('name')}
+        return slim
+    if event == 'THREAD_CREATE':
+        return {key: data.get(key) for key in ('id', 'parent_id', 'guild_id', 'owner_id', 'name', 'newly_created')}
+    if event == 'INTERACTION_CREATE':
+        member = data.get('member') or {}
+        command = data.get('data') or {}
+        resolved = command.get('resolved') or {}
+        return {
+            'id': data['id'],
+            'type': data['type'],
+            'channel_id': data.get('channel_id'),
+            'guild_id': data.get('guild_id'),
+            'user': _slim_user(member.get('user') or data.get('user')),
+            'permissions': member.get('permissions'),
+            'data': {
+                'name': command.get('name'),
+                'type': command.get('type'),
+                'target_id': command.get('target_id'),
+                'options': command.get('options', []),
+                'attachments': {
+                    key: _slim_attachment(value) for key, value in (resolved.get('attachments') or {}).items()
+                },
+            },
+        }
+    return data
+
+
+class GatewayRecorder:
+    """Appends the gateway events the cogs handle to a JSONL log (gzip if the path ends in .gz).
+
+    Each line is ``{"t": <unix time>, "e": <event>, "d": <slimmed payload>}``;
+    the first line is a header with the bot's user ID. Installed by wrapping
+    the connection state's parsers, so events are captured exactly as
+    discord.py receives them. Message content is recorded, so logs should be
+    treated like chat history.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.events = 0
+        self._fh = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    def install(self, bot) -> None:
+        if self._fh is not None:
+            return
+        opener = gzip.open if self.path.endswith('.gz') else open
+        self._fh = opener(self.path, 'at', encoding='utf-8')
+        self._bot = bot
+        self._header_written = False
+        parsers = bot._connection.parsers
+        for event in RECORDED_EVENTS:
+            parsers[event] = self._wrap(event, parsers[event])
+        self._flusher = asyncio.create_task(self._flush_loop())
+        logger.info(f"Recording gateway events to {self.path}")
+
+    def _wrap(self, event: str, parser):
+        def record_then_parse(data):
+            try:
+                self.write(event, data)
+            except Exception as e:
+                logger.error(f"Failed to record {event}: {e}")
+            return parser(data)
+        return record_then_parse
+
+    def write(self, event: str, data: Dict[str, Any]) -> None:
+        if not self._header_written and self._bot.user is not None:
+            self._emit({'t': time.time(), 'e': 'HEADER', 'd': {'bot_id': str(self._bot.user.id), 'version': 1}})
+            self._header_written = True
+        self._emit({'t': time.time(), 'e': event, 'd': slim_payload(event, data)})
+        self.events += 1
+
+    def _emit(self, record: Dict[str, Any]) -> None:
+        self._fh.write(json.dumps(record, separators=(',', ':'), ensure_ascii=False) + '\n')
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self._fh.flush()
+
+    def close(self) -> None:
+        if self._flusher:
+            self._flusher.cancel()
+            self._flusher = None
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+            logger.info(f"Recorded {self.events} gateway events to {self.path}")
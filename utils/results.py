@@ -0,0 +1,137 @@
+import logging
+import os
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import discord
+
+logger = logging.getLogger('discord')
+
+MEDALS = ["🥇", "🥈", "🥉"]
+
+# Discord's per-message limits
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+MAX_FILES_PER_MESSAGE = 10
+MAX_TITLE_CHARS = 256
+MAX_DESCRIPTION_CHARS = 4096
+MAX_CONTENT_CHARS = 2000
+# Upload limit of a guild without boosts; pass ``guild.filesize_limit`` for the real one
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+
+
+def _clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class ResultsRenderer:
+    """Builds a competition's results announcement once, as embeds.
+
+    ``winners`` are dicts with ``votes``, ``punchline``, ``mention``, the
+    repost's jump ``url`` and an optional list of spooled attachment ``refs``.
+    ``render`` packs the header and winner embeds, together with their image
+    files, into as few messages as Discord's limits allow (normally one),
+    keeping each message's uploads under ``max_upload_bytes``. The
+    thread copy reuses the embeds Discord returned for the channel messages,
+    so images are uploaded only once.
+    """
+
+    def __init__(self, setup: str, winners: List[Dict], thread_url: str, max_upload_bytes: int = MAX_UPLOAD_BYTES):
+        self.setup = setup
+        self.winners = winners[:len(MEDALS)]
+        self.thread_url = thread_url
+        self.max_upload_bytes = max_upload_bytes
+
+    def _header(self) -> discord.Embed:
+        description = f"**Setup:** {self.setup}"
+        if not self.winners:
+            description += "\n\n### No votes were cast in this competition!"
+        return discord.Embed(
+            title="🏆 WINNERS 🏆",
+            description=_clip(description, MAX_DESCRIPTION_CHARS),
+            color=discord.Color.gold(),
+        )
+
+    def _winner_embeds(self, medal: str, winner: Dict, filenames: List[str]) -> List[discord.Embed]:
+        embed = discord.Embed(
+            title=_clip(f"{medal} {winner['votes']} votes", MAX_TITLE_CHARS),
+            description=_clip(f"{winner['punchline']}\nby {winner['mention']}", MAX_DESCRIPTION_CHARS),
+            color=discord.Color.gold(),
+            # Embeds sharing a URL are shown by Discord as one card with an image gallery
+            url=winner['url'],
+        )
+        if not filenames:
+            return [embed]
+        embed.set_image(url=f"attachment://{filenames[0]}")
+        embeds = [embed]
+        for filename in filenames[1:]:
+            extra = discord.Embed(url=winner['url'])
+            extra.set_image(url=f"attachment://{filename}")
+            embeds.append(extra)
+        return embeds
+
+    def channel_content(self) -> str:
+        mentions = " ".join(dict.fromkeys(winner['mention'] for winner in self.winners))
+        content = f"See all submissions in the [joke thread]({self.thread_url})\n\nThanks everyone for participating!"
+        if mentions:
+            content = f"Congratulations {mentions}!\n{content}"
+        return _clip(content, MAX_CONTENT_CHARS)
+
+    async def render(self, open_file: Callable[[Dict], Awaitable[Optional[discord.File]]]) -> List[Dict]:
+        """Message payloads (``content``/``embeds``/``files`` kwargs) for the results channel"""
+        # Each group of embeds must stay in the same message as its files
+        groups = [([self._header()], [], 0)]
+        for index, (medal, winner) in enumerate(zip(MEDALS, self.winners)):
+            files = []
+            upload = 0
+            for ref in winner.get('refs') or []:
+                if upload + ref['size'] > self.max_upload_bytes:
+                    logger.warning(f"Skipping winner image {ref['filename']}: over the {self.max_upload_bytes} byte upload limit")
+                    continue
+                try:
+                    spooled = await open_file(ref)
+                except Exception as e:
+                    logger.error(f"Error loading winner image: {e}")
+                    continue
+                if spooled is not None:
+                    # Submitters' filenames collide (image.png) and attachment:// resolves by name
+                    _, ext = os.path.splitext(ref['filename'])
+                    spoiler = spooled.spoiler
+                    spooled.filename = f"winner{index}_{len(files)}{ext}"
+                    spooled.spoiler = spoiler
+                    files.append(spooled)
+                    upload += ref['size']
+            groups.append((self._winner_embeds(medal, winner, [f.filename for f in files]), files, upload))
+
+        pages = []
+        page = {'embeds': [], 'files': []}
+        chars = 0
+        page_upload = 0
+        for embeds, files, upload in groups:
+            size = sum(len(embed) for embed in embeds)
+            full = (
+                len(page['embeds']) + len(embeds) > MAX_EMBEDS_PER_MESSAGE
+                or chars + size > MAX_EMBED_CHARS_PER_MESSAGE
+                or len(page['files']) + len(files) > MAX_FILES_PER_MESSAGE
+                or page_upload + upload > self.max_upload_bytes
+            )
+            if page['embeds'] and full:
+                pages.append(page)
+                page = {'embeds': [], 'files': []}
+                chars = 0
+                page_upload = 0
+            page['embeds'].extend(embeds)
+            page['files'].extend(files)
+            chars += size
+            page_upload += upload
+        pages.append(page)
+
+        pages[-1]['content'] = self.channel_content()
+        return pages
+
+    def thread_pages(self, sent: List[discord.Message]) -> List[Dict]:
+        """Thread payloads reusing the embeds Discord returned for the channel messages"""
+        pages = [{'embeds': message.embeds} for message in sent if message.embeds]
+        if not pages:
+            pages = [{'embeds': [self._header()]}]
+        pages[-1]['content'] = "Thanks everyone for participating!"
+        return pages
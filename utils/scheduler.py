@@ -0,0 +1,120 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger('discord')
+
+
+class DeadlineScheduler:
+    """Runs coroutine callbacks at wall-clock deadlines from a single sleeping task.
+
+    Deadlines live in a min-heap; the runner sleeps until the earliest one and is
+    woken early whenever an earlier deadline is scheduled. Cancelled or replaced
+    entries are dropped lazily when they reach the top of the heap.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._entries: Dict[Hashable, Tuple[float, int, Callable, tuple]] = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+        self._tasks = set()
+
+    @staticmethod
+    def _timestamp(when) -> float:
+        if isinstance(when, datetime):
+            return when.timestamp()
+        return float(when)
+
+    def schedule(self, key: Hashable, when, callback: Callable[..., Any], *args) -> None:
+        """Run ``callback(*args)`` at ``when`` (datetime or epoch seconds), replacing any entry for ``key``"""
+        deadline = self._timestamp(when)
+        seq = next(self._counter)
+        self._entries[key] = (deadline, seq, callback, args)
+        heapq.heappush(self._heap, (deadline, seq, key))
+        if self._heap[0][1] == seq:
+            self._wakeup.set()
+        self._ensure_running()
+
+    def cancel(self, key: Hashable) -> bool:
+        """Forget the entry for ``key``; returns whether one was pending"""
+        if self._entries.pop(key, None) is None:
+            return False
+        # Compact once cancelled entries dominate the heap
+        if len(self._heap) > 2 * len(self._entries) + 16:
+            self._heap = [item for item in self._heap if self._is_live(item)]
+            heapq.heapify(self._heap)
+        return True
+
+    def rebind(self, kind: str, target: Any) -> int:
+        """Point pending callbacks of ``kind`` at the same-named methods of ``target``.
+
+        Used when a cog is reloaded: deadlines and arguments are kept, only the
+        instance the callbacks run on changes. Returns the number of entries rebound.
+        """
+        rebound = 0
+        for key, (deadline, seq, callback, args) in self._entries.items():
+            if isinstance(key, tuple) and key and key[0] == kind:
+                self._entries[key] = (deadline, seq, getattr(target, callback.__name__), args)
+                rebound += 1
+        return rebound
+
+    def when(self, key: Hashable) -> Optional[float]:
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def pending(self, kind: Optional[str] = None) -> List[Tuple[Hashable, float]]:
+        """Pending ``(key, deadline)`` pairs in firing order, optionally filtered by ``key[0]``"""
+        items = [(key, entry[0]) for key, entry in self._entries.items()
+                 if kind is None or (isinstance(key, tuple) and key and key[0] == kind)]
+        items.sort(key=lambda item: item[1])
+        return items
+
+    def close(self) -> None:
+        if self._runner:
+            self._runner.cancel()
+            self._runner = None
+        for task in list(self._tasks):
+            task.cancel()
+
+    def _is_live(self, item: Tuple[float, int, Hashable]) -> bool:
+        entry = self._entries.get(item[2])
+        return entry is not None and entry[1] == item[1]
+
+    def _ensure_running(self) -> None:
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                deadline, seq, key = heapq.heappop(self._heap)
+                if not self._is_live((deadline, seq, key)):
+                    continue
+                entry = self._entries.pop(key)
+                self._fire(key, entry[2], entry[3])
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _fire(self, key: Hashable, callback: Callable[..., Any], args: tuple) -> None:
+        task = asyncio.create_task(callback(*args))
+        self._tasks.add(task)
+
+        def _done(finished: asyncio.Task):
+            self._tasks.discard(finished)
+            if not finished.cancelled() and finished.exception():
+                logger.error(f"Scheduled job {key!r} failed: {finished.exception()!r}")
+
+        task.add_done_callback(_done)
+
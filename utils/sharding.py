@@ -0,0 +1,65 @@
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+
+def shard_for(guild_id: int, shard_count: int) -> int:
+    """The shard Discord routes a guild's events to"""
+    return (guild_id >> 22) % shard_count
+
+
+def parse_shard_ids(spec: str) -> Sequence[int]:
+    """``"0-3"``, ``"4,5,7"`` or a mix like ``"0-1,4"``"""
+    shard_ids = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            first, last = (int(bound) for bound in part.split('-', 1))
+            shard_ids.extend(range(first, last + 1))
+        else:
+            shard_ids.append(int(part))
+    return sorted(set(shard_ids))
+
+
+class ShardPartition:
+    """Which guilds this process is responsible for.
+
+    Unsharded (``shard_count`` None) it owns every guild. Otherwise it owns
+    the guilds whose shard is in ``shard_ids``, or all shards if ``shard_ids``
+    is None. Records without a guild (saved before state was split by guild)
+    belong to the process running shard 0, so exactly one process picks
+    them up.
+    """
+
+    def __init__(self, shard_count: Optional[int] = None, shard_ids: Optional[Iterable[int]] = None):
+        self.shard_count = shard_count
+        self.shard_ids = None if shard_ids is None else frozenset(shard_ids)
+
+    @property
+    def sharded(self) -> bool:
+        return self.shard_count is not None
+
+    def shard_of(self, guild_id: Optional[int]) -> int:
+        if not self.sharded or guild_id is None:
+            return 0
+        return shard_for(guild_id, self.shard_count)
+
+    def owns(self, guild_id: Optional[int]) -> bool:
+        if not self.sharded or self.shard_ids is None:
+            return True
+        return self.shard_of(guild_id) in self.shard_ids
+
+    def client_options(self) -> Dict[str, Any]:
+        """``AutoShardedBot`` keyword arguments for this partition"""
+        if not self.sharded:
+            return {}
+        options = {'shard_count': self.shard_count}
+        if self.shard_ids is not None:
+            options['shard_ids'] = sorted(self.shard_ids)
+        return options
+
+    def __repr__(self) -> str:
+        if not self.sharded:
+            return '<ShardPartition unsharded>'
+        shards = 'all' if self.shard_ids is None else ','.join(map(str, sorted(self.shard_ids)))
+        return f'<ShardPartition shards={shards} of {self.shard_count}>'
@@ -0,0 +1,170 @@
+import re
+import unicodedata
+import zlib
+from array import array
+from typing import Dict, Hashable, List, Optional, Tuple
+
+# Characters per shingle; short enough that a one-word edit leaves most shingles intact
+SHINGLE_SIZE = 5
+# MinHash slots per signature, split into LSH bands of BAND_ROWS slots. With
+# 8 bands of 3, a pair with Jaccard similarity 0.7 shares a band ~96% of the time
+NUM_PERM = 24
+BAND_ROWS = 3
+# Candidates verified per query at most; huge buckets only hold near-identical texts anyway
+MAX_CANDIDATES = 64
+
+# Odd multiplier spreading crc32's linear output before shingles are binned
+_MIX = 0x9E3779B1
+_EMPTY = 1 << 32
+_NON_WORD = re.compile(r'[^\w\s]+')
+_SPACE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """Case, accents, punctuation and spacing don't make a punchline different"""
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _SPACE.sub(' ', _NON_WORD.sub('', text)).strip()
+
+
+def signature(text: str) -> array:
+    """MinHash signature of ``text``'s character shingles after normalization.
+
+    Uses one-permutation hashing: each shingle is hashed once and kept as the
+    minimum of one of ``NUM_PERM`` bins, instead of hashing it ``NUM_PERM``
+    times. Bins no shingle fell into borrow from the next filled bin
+    (densification), so short texts still compare slot by slot. Signatures
+    are persisted, so this must stay deterministic across runs.
+    """
+    normalized = normalize_text(text).encode()
+    if len(normalized) <= SHINGLE_SIZE:
+        chunks = [normalized]
+    else:
+        chunks = [normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)]
+    bins = [_EMPTY] * NUM_PERM
+    for chunk in chunks:
+        mixed = (zlib.crc32(chunk) * _MIX) & 0xFFFFFFFF
+        slot, value = mixed % NUM_PERM, mixed // NUM_PERM
+        if value < bins[slot]:
+            bins[slot] = value
+    for slot in range(NUM_PERM):
+        if bins[slot] == _EMPTY:
+            for distance in range(1, NUM_PERM):
+                borrowed = bins[(slot + distance) % NUM_PERM]
+                if borrowed < _EMPTY:
+                    # Tag the borrowed value with the distance so it can't equal a filled bin by accident
+                    bins[slot] = borrowed + distance * _EMPTY
+                    break
+    return array('Q', bins)
+
+
+def similarity(first: array, second: array) -> float:
+    """Estimated Jaccard similarity of the texts behind two signatures"""
+    return sum(x == y for x, y in zip(first, second)) / NUM_PERM
+
+
+class SimilarityIndex:
+    """Locality-sensitive index of MinHash signatures for near-duplicate lookups.
+
+    Each signature is cut into bands and an entry is filed under every band
+    it has; two texts are candidates when they share a band, which makes a
+    query cost a handful of dict probes regardless of corpus size. Entries
+    carry a ``namespace`` (a guild ID) that is part of every band key, so
+    guilds never match each other. Removed entries are unfiled from their
+    bands and their slots reused, so the index only holds live entries.
+    """
+
+    def __init__(self, threshold: float = 0.7):
+        self.threshold = threshold
+        self._keys: List[Optional[Hashable]] = []
+        self._signatures: List[Optional[array]] = []
+        self._namespaces: List[object] = []
+        self._ids: Dict[Hashable, int] = {}
+        # Slots of removed entries, reused before the lists grow
+        self._free: List[int] = []
+        # band key -> entry ID, or a list of entry IDs once several share the band
+        self._buckets: Dict[int, object] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, key) -> bool:
+        return key in self._ids
+
+    @staticmethod
+    def _bands(sig: array, namespace) -> List[int]:
+        return [hash((namespace, start, *sig[start:start + BAND_ROWS])) for start in range(0, NUM_PERM, BAND_ROWS)]
+
+    def add(self, key: Hashable, text: str, namespace=None, sig: Optional[array] = None) -> array:
+        """File ``text`` under ``key``; pass ``sig`` when it is already known. Returns the signature"""
+        if sig is None:
+            sig = signature(text)
+        self.discard(key)
+        if self._free:
+            entry_id = self._free.pop()
+            self._keys[entry_id] = key
+            self._signatures[entry_id] = sig
+            self._namespaces[entry_id] = namespace
+        else:
+            entry_id = len(self._keys)
+            self._keys.append(key)
+            self._signatures.append(sig)
+            self._namespaces.append(namespace)
+        self._ids[key] = entry_id
+        for band in self._bands(sig, namespace):
+            bucket = self._buckets.get(band)
+            if bucket is None:
+                self._buckets[band] = entry_id
+            elif isinstance(bucket, int):
+                self._buckets[band] = [bucket, entry_id]
+            else:
+                bucket.append(entry_id)
+        return sig
+
+    def discard(self, key: Hashable) -> None:
+        entry_id = self._ids.pop(key, None)
+        if entry_id is None:
+            return
+        for band in self._bands(self._signatures[entry_id], self._namespaces[entry_id]):
+            bucket = self._buckets.get(band)
+            if bucket == entry_id:
+                del self._buckets[band]
+            elif isinstance(bucket, list):
+                bucket.remove(entry_id)
+                if len(bucket) == 1:
+                    self._buckets[band] = bucket[0]
+        self._keys[entry_id] = None
+        self._signatures[entry_id] = None
+        self._namespaces[entry_id] = None
+        self._free.append(entry_id)
+
+    def signature_of(self, key: Hashable) -> Optional[array]:
+        entry_id = self._ids.get(key)
+        return self._signatures[entry_id] if entry_id is not None else None
+
+    def query(self, text: str, namespace=None, sig: Optional[array] = None) -> List[Tuple[Hashable, float]]:
+        """Keys of entries at least ``threshold`` similar to ``text``, most similar first"""
+        if sig is None:
+            sig = signature(text)
+        seen = set()
+        matches = []
+        for band in self._bands(sig, namespace):
+            bucket = self._buckets.get(band)
+            if bucket is None:
+                continue
+            # Newest entries first: they are the likeliest copies
+            for entry_id in ([bucket] if isinstance(bucket, int) else reversed(bucket)):
+                if entry_id in seen:
+                    continue
+                seen.add(entry_id)
+                key = self._keys[entry_id]
+                if key is not None:
+                    score = similarity(sig, self._signatures[entry_id])
+                    if score >= self.threshold:
+                        matches.append((key, score))
+                if len(seen) >= MAX_CANDIDATES:
+                    break
+            if len(seen) >= MAX_CANDIDATES:
+                break
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+import aiohttp
+import discord
+
+logger = logging.getLogger('discord')
+
+# Downloaded bytes collected before they are handed to a worker thread for writing
+WRITE_BATCH_BYTES = 1024 * 1024
+
+
+def _write(path: str, chunks: List[bytes], create: bool) -> None:
+    with open(path, 'wb' if create else 'ab') as fh:
+        fh.writelines(chunks)
+
+
+class AttachmentSpool:
+    """Size-capped on-disk cache for competition attachments.
+
+    Attachments are streamed to a spool directory in chunks instead of being
+    held in memory as ``discord.File`` objects. Callers keep a small ``ref``
+    dict (key, filename, url, size) that is safe to persist, and ask for a
+    fresh ``discord.File`` whenever they need to post it. When the total size
+    goes over ``max_bytes`` the least recently used files are evicted; an
+    evicted file is fetched again from its URL on demand. Downloads in
+    flight count against ``max_bytes`` from the start, concurrent requests
+    for the same file share one download, and disk I/O runs in a worker
+    thread. Files a previous run left in ``root`` are removed on startup,
+    so ``root`` must belong to this process alone.
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        max_bytes: int = 256 * 1024 * 1024,
+        chunk_size: int = 64 * 1024,
+        fetch: Optional[Callable[[str], AsyncIterator[bytes]]] = None,
+    ):
+        # Only a directory we created ourselves is removed wholesale on close
+        self._owns_root = root is None
+        self.root = root or tempfile.mkdtemp(prefix='sketchy-spool-')
+        os.makedirs(self.root, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.total_bytes = 0
+        self._fetch = fetch or self._http_fetch
+        self._session: Optional[aiohttp.ClientSession] = None
+        # key -> {'path', 'size', 'group'} in least-recently-used order
+        self._entries: 'OrderedDict[str, Dict]' = OrderedDict()
+        # Bytes set aside for downloads still in flight, and downloads waiting for some to finish
+        self.reserved_bytes = 0
+        self._room_waiters: List[asyncio.Future] = []
+        # key -> the download in progress, awaited by everyone who needs that file
+        self._downloads: Dict[str, asyncio.Task] = {}
+        if not self._owns_root:
+            self._prune()
+
+    def _prune(self) -> None:
+        """Remove files a crashed run left behind; nothing tracks them, so nothing would evict them"""
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isfile(path):
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.warning(f"Could not remove stale spool file {path}: {e}")
+
+    async def _http_fetch(self, url: str) -> AsyncIterator[bytes]:
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        async with self._session.get(url) as resp:
+            resp.raise_for_status()
+            async for chunk in resp.content.iter_chunked(self.chunk_size):
+                yield chunk
+
+    async def store(self, group, attachment) -> Dict:
+        """Stream ``attachment`` into the spool under ``group`` and return its ref"""
+        ref = {
+            'key': f"{group}-{attachment.id}",
+            'filename': attachment.filename,
+            'url': attachment.url,
+            'size': attachment.size,
+            'group': str(group),
+        }
+        await self._download(ref)
+        return ref
+
+    async def _download(self, ref: Dict) -> None:
+        key = ref['key']
+        task = self._downloads.get(key)
+        if task is None:
+            task = self._downloads[key] = asyncio.ensure_future(self._fetch_into(ref))
+            task.add_done_callback(lambda done: self._downloads.pop(key) if self._downloads.get(key) is done else None)
+        # A caller giving up doesn't cancel the download for the others
+        await asyncio.shield(task)
+
+    async def _fetch_into(self, ref: Dict) -> None:
+        if ref['key'] in self._entries:
+            self._remove(self._entries.pop(ref['key']))
+        expected = ref['size']
+        await self._reserve(expected)
+        _, ext = os.path.splitext(ref['filename'])
+        path = os.path.join(self.root, ref['key'] + ext)
+        size = 0
+        try:
+            # Chunks are written in batches, so a small image costs a single hop to the worker thread
+            pending: List[bytes] = []
+            pending_bytes = 0
+            first = True
+            async for chunk in self._fetch(ref['url']):
+                pending.append(chunk)
+                pending_bytes += len(chunk)
+                size += len(chunk)
+                if pending_bytes >= WRITE_BATCH_BYTES:
+                    await asyncio.to_thread(_write, path, pending, first)
+                    pending, pending_bytes, first = [], 0, False
+            if pending or first:
+                await asyncio.to_thread(_write, path, pending, first)
+        except BaseException:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        finally:
+            self._unreserve(expected)
+        self._entries[ref['key']] = {'path': path, 'size': size, 'group': ref['group']}
+        self.total_bytes += size
+
+    async def _reserve(self, size: int) -> None:
+        """Set ``size`` bytes aside, evicting finished files or waiting for downloads in flight to finish"""
+        while True:
+            self._make_room(size)
+            # A download that fits, or the only one running; a single oversized file is still spooled
+            if not self.reserved_bytes or self.total_bytes + self.reserved_bytes + size <= self.max_bytes:
+                self.reserved_bytes += size
+                return
+            waiter = asyncio.get_running_loop().create_future()
+            self._room_waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._room_waiters:
+                    self._room_waiters.remove(waiter)
+
+    def _unreserve(self, size: int) -> None:
+        # Synchronous, so a cancelled download still gives its reservation back
+        self.reserved_bytes -= size
+        waiters, self._room_waiters = self._room_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _make_room(self, incoming: int) -> None:
+        while self._entries and self.total_bytes + self.reserved_bytes + incoming > self.max_bytes:
+            key, entry = self._entries.popitem(last=False)
+            self._remove(entry)
+            logger.info(f"Evicted spooled attachment {key} ({entry['size']} bytes)")
+
+    def _remove(self, entry: Dict) -> None:
+        self.total_bytes -= entry['size']
+        try:
+            os.remove(entry['path'])
+        except FileNotFoundError:
+            pass
+
+    async def open(self, ref: Dict) -> Optional[discord.File]:
+        """A new ``discord.File`` for a spooled ref, or None if it was evicted"""
+        entry = self._entries.get(ref['key'])
+        if entry is None:
+            return None
+        self._entries.move_to_end(ref['key'])
+        try:
+            return await asyncio.to_thread(discord.File, entry['path'], filename=ref['filename'])
+        except FileNotFoundError:
+            if self._entries.get(ref['key']) is entry:
+                self._remove(self._entries.pop(ref['key']))
+            return None
+
+    async def file(self, ref: Dict) -> discord.File:
+        """Like ``open`` but re-fetches evicted attachments from their URL"""
+        spooled = await self.open(ref)
+        if spooled is not None:
+            return spooled
+        await self._download(ref)
+        return await self.open(ref)
+
+    def release(self, group) -> None:
+        """Delete every spooled file belonging to ``group``"""
+        group = str(group)
+        for key in [key for key, entry in self._entries.items() if entry['group'] == group]:
+            self._remove(self._entries.pop(key))
+
+    async def close(self) -> None:
+        for task in list(self._downloads.values()):
+            task.cancel()
+        await asyncio.gather(*self._downloads.values(), return_exceptions=True)
+        for entry in self._entries.values():
+            self._remove(entry)
+        self._entries.clear()
+        if self._owns_root:
+            shutil.rmtree(self.root, ignore_errors=True)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger('discord')
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    raise TypeError(f"Cannot persist {type(value).__name__}")
+
+
+def _decode(obj):
+    if '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+
+class StateStore:
+    """Write-behind key/value store for cog state, backed by SQLite in WAL mode.
+
+    ``put`` and ``delete`` only record the change in memory; a background task
+    coalesces them and writes each batch in one transaction on a dedicated
+    thread, so callers on the event loop never wait on disk. A store created
+    with ``path=None`` is disabled and every operation is a no-op.
+    """
+
+    def __init__(self, path: Optional[str], flush_interval: float = 0.5):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._pending: Dict[Tuple[str, str], Optional[str]] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._dirty: Optional[asyncio.Event] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    async def open(self) -> None:
+        if not self.enabled or self._conn is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='state-store')
+        self._dirty = asyncio.Event()
+        await self._run(self._connect)
+        self._flusher = asyncio.create_task(self._flush_loop())
+        logger.info(f"State store opened at {self.path}")
+
+    def _connect(self) -> None:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " PRIMARY KEY (namespace, key)"
+            ") WITHOUT ROWID"
+        )
+        conn.commit()
+        self._conn = conn
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def put(self, namespace: str, key, value: Any) -> None:
+        """Queue ``value`` (JSON-serialisable, datetimes allowed) to be written under ``namespace``/``key``"""
+        if not self.enabled:
+            return
+        self._pending[(namespace, str(key))] = json.dumps(value, default=_encode)
+        self._mark_dirty()
+
+    def delete(self, namespace: str, key) -> None:
+        if not self.enabled:
+            return
+        self._pending[(namespace, str(key))] = None
+        self._mark_dirty()
+
+    def _mark_dirty(self) -> None:
+        if self._dirty is not None:
+            self._dirty.set()
+
+    async def load(self, namespace: str) -> Dict[str, Any]:
+        """Read every entry in ``namespace``, including writes that are still queued"""
+        if not self.enabled or self._conn is None:
+            return {}
+        rows = await self._run(self._select, namespace)
+        entries = {key: json.loads(value, object_hook=_decode) for key, value in rows}
+        for (pending_namespace, key), value in self._pending.items():
+            if pending_namespace != namespace:
+                continue
+            if value is None:
+                entries.pop(key, None)
+            else:
+                entries[key] = json.loads(value, object_hook=_decode)
+        return entries
+
+    def _select(self, namespace: str):
+        return self._conn.execute(
+            "SELECT key, value FROM state WHERE namespace = ?", (namespace,)
+        ).fetchall()
+
+    async def flush(self) -> int:
+        """Write everything queued so far; returns the number of keys written"""
+        if not self._pending or self._conn is None:
+            return 0
+        batch, self._pending = self._pending, {}
+        try:
+            await self._run(self._write, batch)
+        except sqlite3.Error as e:
+            logger.error(f"State store flush failed, retrying later: {e}")
+            # Keep newer writes that arrived while this batch was in flight
+            batch.update(self._pending)
+            self._pending = batch
+            return 0
+        return len(batch)
+
+    def _write(self, batch: Dict[Tuple[str, str], Optional[str]]) -> None:
+        upserts = [(ns, key, value) for (ns, key), value in batch.items() if value is not None]
+        deletes = [(ns, key) for (ns, key), value in batch.items() if value is None]
+        with self._conn:
+            if upserts:
+                self._conn.executemany(
+                    "INSERT INTO state (namespace, key, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value",
+                    upserts
+                )
+            if deletes:
+                self._conn.executemany("DELETE FROM state WHERE namespace = ? AND key = ?", deletes)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._dirty.wait()
+            # Let a burst of writes accumulate into one transaction
+            await asyncio.sleep(self.flush_interval)
+            self._dirty.clear()
+            await self.flush()
+
+    async def close(self) -> None:
+        if self._conn is None:
+            return
+        if self._flusher:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+        await self._run(self._conn.close)
+        self._conn = None
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        logger.info("State store closed")
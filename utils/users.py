@@ -0,0 +1,3 @@
+def user_mention(user_id: int) -> str:
+    """Discord's ``<@id>`` mention form; it needs neither a cached member nor a REST call"""
+    return f"<@{user_id}>"
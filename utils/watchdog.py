@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, List, Optional
+
+logger = logging.getLogger('discord')
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StallDetector:
+    """Measures event-loop lag continuously and reports what was running when the loop stalled.
+
+    A probe task on the loop wakes every ``interval`` seconds and records how
+    late it ran. A stall can't be inspected from the loop while it is blocked,
+    so a watchdog thread watches the probe's heartbeat and, once it's more than
+    ``threshold`` seconds overdue, snapshots the loop thread's stack and the
+    task that is running. When the probe next wakes, the lag and the snapshot
+    are combined into a report which is logged and kept for ``!stalls``.
+    """
+
+    def __init__(self, threshold: float = 0.25, interval: float = 0.1, keep: int = 100, metrics=None):
+        self.threshold = threshold
+        self.interval = interval
+        self.metrics = metrics
+        self.stalls = deque(maxlen=keep)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_tick = time.monotonic()
+        self._capture: Optional[Dict] = None
+        self._lock = threading.Lock()
+        self._probe: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        if self._probe is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stop.clear()
+        self._probe = asyncio.create_task(self._probe_loop())
+        self._thread = threading.Thread(target=self._watch, name='loop-stall-watchdog', daemon=True)
+        self._thread.start()
+
+    async def _probe_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            with self._lock:
+                self._last_tick = time.monotonic()
+                capture, self._capture = self._capture, None
+            if self.metrics is not None:
+                self.metrics.observe('event_loop_lag_seconds', lag)
+            if lag >= self.threshold:
+                self._report(lag, capture)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                overdue = time.monotonic() - self._last_tick - self.interval
+                if overdue < self.threshold or self._capture is not None:
+                    continue
+                self._capture = self._snapshot()
+
+    def _snapshot(self) -> Dict:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.extract_stack(frame) if frame is not None else []
+        task = asyncio.current_task(self._loop)
+        coro = task.get_coro() if task is not None else None
+        return {
+            'task': task.get_name() if task is not None else None,
+            'coroutine': getattr(coro, '__qualname__', None),
+            'stack': stack,
+        }
+
+    def _report(self, lag: float, capture: Optional[Dict]) -> None:
+        stack: List[traceback.FrameSummary] = capture['stack'] if capture else []
+        ours = [frame for frame in stack if frame.filename.startswith(PROJECT_ROOT) and '/venv/' not in frame.filename]
+        culprit = ours[-1] if ours else (stack[-1] if stack else None)
+        report = {
+            'at': time.time(),
+            'duration': lag,
+            'task': capture['task'] if capture else None,
+            'coroutine': capture['coroutine'] if capture else None,
+            'location': (
+                f"{os.path.relpath(culprit.filename, PROJECT_ROOT)}:{culprit.lineno} in {culprit.name}"
+                if culprit else None
+            ),
+            'stack': ''.join(traceback.format_list(stack)),
+        }
+        self.stalls.append(report)
+        if self.metrics is not None:
+            self.metrics.inc('event_loop_stalls_total')
+        logger.warning(
+            f"Event loop stalled for {lag * 1000:.0f}ms in {report['coroutine'] or 'a callback'} "
+            f"({report['task'] or 'no task'}) at {report['location'] or 'unknown location'}"
+        )
+
+    def worst(self, count: int = 5, window: float = 3600) -> List[Dict]:
+        """The longest stalls seen in the last ``window`` seconds"""
+        cutoff = time.time() - window
+        recent = [stall for stall in self.stalls if stall['at'] >= cutoff]
+        return sorted(recent, key=lambda stall: stall['duration'], reverse=True)[:count]
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._probe:
+            self._probe.cancel()
+            self._probe = None
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None